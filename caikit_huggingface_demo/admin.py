@@ -0,0 +1,120 @@
+# Copyright The Caikit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+
+# Standard
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+import json
+import threading
+
+# Third Party
+from runtime.memory_report import ALLOCATIONS, memory_report
+from runtime.profiling import PROFILER
+
+# First Party
+import alog
+
+# Local
+from caikit.config import get_config
+
+log = alog.use_channel("ADMIN")
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8087
+
+
+def _flag(value: str) -> bool:
+    return value.lower() in ("1", "true", "yes")
+
+
+def _profile_start(params: Dict[str, str]) -> dict:
+    return PROFILER.start(
+        model_id=params.get("model"),
+        duration_s=float(params.get("seconds", 60)),
+        sample_rate=float(params.get("sample_rate", 1.0)),
+        max_requests=int(params.get("requests", 10)),
+        torch_trace=_flag(params.get("torch", "")),
+    )
+
+
+def _memory(params: Dict[str, str]) -> dict:
+    return memory_report(top=int(params.get("top", 10)))
+
+
+# (HTTP method, path) -> handler of the query parameters returning a JSON object
+ROUTES: Dict[Tuple[str, str], Callable[[Dict[str, str]], dict]] = {
+    ("GET", "/profile"): lambda params: PROFILER.status(),
+    ("POST", "/profile/start"): _profile_start,
+    ("POST", "/profile/stop"): lambda params: PROFILER.stop(),
+    ("GET", "/memory"): _memory,
+    ("POST", "/memory/tracemalloc/start"): lambda params: ALLOCATIONS.start(
+        int(params.get("frames", 1))
+    ),
+    ("POST", "/memory/tracemalloc/stop"): lambda params: ALLOCATIONS.stop(),
+}
+
+
+class AdminHandler(BaseHTTPRequestHandler):
+    """Dispatches requests to ROUTES. Invalid parameters (ValueError) are a 400."""
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        self._handle("GET")
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        self._handle("POST")
+
+    def _handle(self, method: str) -> None:
+        url = urlparse(self.path)
+        route = ROUTES.get((method, url.path))
+        if route is None:
+            self._reply(404, {"error": f"No such endpoint: {method} {url.path}"})
+            return
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            self._reply(200, route(params))
+        except ValueError as e:
+            self._reply(400, {"error": str(e)})
+
+    def _reply(self, status: int, body: dict) -> None:
+        data = json.dumps(body, indent=2).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        log.debug("<ADM73015562D>", format, *args)
+
+
+def serve_admin(index: Optional[int] = None) -> Optional[int]:
+    """Serve the admin endpoint on admin.port (admin.port + 1 + index in worker
+    processes) in a daemon thread and return the port, or None if it is not
+    available. It binds to admin.host, localhost by default."""
+    config = get_config().get("admin") or {}
+    host = config.get("host", DEFAULT_HOST)
+    port = config.get("port", DEFAULT_PORT)
+    if index is not None:
+        port += 1 + index
+    try:
+        server = ThreadingHTTPServer((host, port), AdminHandler)
+    except OSError as e:
+        # Serve without the admin endpoint rather than fail (and be restarted)
+        log.warning("<ADM73015563W>", "No admin endpoint on port %d: %s", port, e)
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return port
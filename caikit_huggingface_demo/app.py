@@ -14,12 +14,19 @@
 # limitations under the License.
 
 # Standard
+from functools import partial
 import argparse
 import os
 import sys
+import tempfile
 
 # Third Party
+from admin import serve_admin
 from client.app import get_frontend
+from prometheus_client import start_http_server
+from router import isolated_models, serve_models, serve_router
+from runtime.model_manager import LocalModelManager
+from workers import WorkerProcess, WorkerSupervisor, serve_backend
 import grpc
 
 # Local
@@ -28,6 +35,7 @@ from caikit.core import ModuleConfig
 from caikit.runtime.grpc_server import RuntimeGRPCServer
 from caikit.runtime.model_management.model_manager import ModelManager
 from caikit.runtime.service_factory import ServicePackageFactory
+from caikit.runtime.types.caikit_runtime_exception import CaikitRuntimeException
 
 # runtime library config
 CONFIG_PATH = os.path.realpath(
@@ -51,7 +59,7 @@ def _get_module_models(model_manager=None) -> dict:
     dict - mapping loaded module module_ids to loaded model model_ids
 
     """
-    if model_manager:
+    if model_manager and not model_manager.lazy:
         model_modules = {
             k: v.module().metadata["module_id"]
             for (k, v) in model_manager.loaded_models.items()
@@ -59,6 +67,7 @@ def _get_module_models(model_manager=None) -> dict:
     else:
         model_modules = {}
         # Without loading models build a map from local_models_dir configs
+        # (with lazy loading, every model there is available on first request)
         local_models_path = get_config().runtime.local_models_dir
         if os.path.exists(local_models_path):
             for model_id in os.listdir(local_models_path):
@@ -102,6 +111,12 @@ def _parse_args():
         action="store_false",
         help="Flag to run without frontend",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of backend server processes sharing the port (default 1)",
+    )
     args = parser.parse_args()
     # By default backend and frontend both start unless explicitly disabled with --no-backend or --no-frontend
     # or if one is explicitly enabled with --backend or --frontend and the other is not.
@@ -117,7 +132,7 @@ def _parse_args():
         if not frontend:
             print("  * --no-frontend")
 
-    return backend, frontend
+    return backend, frontend, args.workers
 
 
 def start_frontend(backend, inference_service):
@@ -135,9 +150,36 @@ def start_frontend(backend, inference_service):
     print("⏹️  Stopped")
 
 
+def _isolated_processes(inference_service, isolated) -> list:
+    """A process per isolated model, one for the other models, and the router that
+    forwards to them by mm-model-id (over unix sockets)"""
+    local_models_dir = get_config().runtime.local_models_dir
+    groups = [[model_id] for model_id in isolated]
+    shared = [m for m in sorted(os.listdir(local_models_dir)) if m not in isolated]
+    if shared:
+        groups.append(shared)
+    socket_dir = tempfile.mkdtemp(prefix="caikit-models-")
+    addresses = [f"unix://{socket_dir}/{i}.sock" for i in range(len(groups))]
+
+    processes = [
+        WorkerProcess(
+            f"Model process {i} ({', '.join(model_ids)})",
+            partial(serve_models, inference_service, model_ids, addresses[i], i),
+        )
+        for i, model_ids in enumerate(groups)
+    ]
+    routes = {m: addresses[i] for i, model_ids in enumerate(groups) for m in model_ids}
+    processes.append(
+        WorkerProcess(
+            "Router", partial(serve_router, routes, addresses[-1], len(groups))
+        )
+    )
+    return processes
+
+
 def main() -> int:
     # Command-line args allow running backend/frontend separately
-    backend, frontend = _parse_args()
+    backend, frontend, workers = _parse_args()
 
     # inference_service is needed for both Caikit backend server and frontend UI
     inference_service = ServicePackageFactory().get_service_package(
@@ -145,7 +187,54 @@ def main() -> int:
     )
 
     if backend:
+        # Prometheus metrics (caikit RPC metrics plus our module metrics)
+        metrics_port = get_config().runtime.metrics.port
+        start_http_server(metrics_port)
+        print(f"📈 Serving backend metrics at http://localhost:{metrics_port}/metrics")
+
+        isolated = isolated_models(get_config().runtime.local_models_dir)
+        if isolated or workers > 1:
+            if isolated and workers > 1:
+                print("⚠️  --workers cannot be used with isolated_process models")
+                return 1
+            if isolated:
+                print(f"▶️  Starting a router and processes for models: {isolated}")
+                processes = _isolated_processes(inference_service, isolated)
+            else:
+                # Load before forking so the workers share the models (copy-on-write)
+                model_manager = LocalModelManager()
+                try:
+                    model_manager.wait_ready()
+                except CaikitRuntimeException as e:
+                    print(f"⚠️  Not starting the backend workers: {e.message}")
+                    return 1
+                print(f"▶️  Starting {workers} backend Caikit inference servers...")
+                processes = [
+                    WorkerProcess(
+                        f"Backend worker {i}",
+                        partial(serve_backend, inference_service, i),
+                    )
+                    for i in range(workers)
+                ]
+            if frontend:
+                processes.append(
+                    WorkerProcess(
+                        "Frontend",
+                        partial(start_frontend, None, inference_service),
+                        restart=False,
+                    )
+                )
+            return WorkerSupervisor(processes).run()
+
+        admin_port = serve_admin()
+        if admin_port:
+            print(f"🔧 Serving the admin endpoint at http://localhost:{admin_port}")
         print("▶️  Starting the backend Caikit inference server...")
+        model_manager = LocalModelManager()  # The ModelManager used by the server
+        if model_manager.ready.is_set():
+            print("✅️  Models are ready")
+        else:
+            print("⏳ Loading models in the background...")
         with RuntimeGRPCServer(
             inference_service=inference_service, training_service=None
         ) as backend:
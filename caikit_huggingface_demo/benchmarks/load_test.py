@@ -0,0 +1,374 @@
+# Copyright The Caikit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+# Standard
+from collections import Counter
+from dataclasses import dataclass, field
+from io import BytesIO
+from typing import Callable, Dict, List, Optional
+import datetime
+import itertools
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+# Third Party
+from google.protobuf.descriptor_pool import DescriptorPool
+from google.protobuf.message_factory import MessageFactory
+from grpc_health.v1 import health_pb2, health_pb2_grpc
+from grpc_reflection.v1alpha.proto_reflection_descriptor_database import (
+    ProtoReflectionDescriptorDatabase,
+)
+from PIL import Image
+import grpc
+import module_ids
+import numpy
+import yaml
+
+# Local
+from .tiny_models import IMAGE_SIZE, save_tiny_model
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TEXT = "The quick brown fox jumps over the lazy dog. It was a great day!"
+PERCENTILES = (50, 95, 99)
+
+
+def _png() -> bytes:
+    pixels = numpy.random.default_rng(0).integers(
+        0, 256, (IMAGE_SIZE, IMAGE_SIZE, 3), dtype=numpy.uint8
+    )
+    image_bytes = BytesIO()
+    Image.fromarray(pixels).save(image_bytes, "PNG")
+    return image_bytes.getvalue()
+
+
+@dataclass
+class BenchTask:
+    """An inference RPC to drive and the module (and tiny model) that serves it"""
+
+    module: str  # Module class name, as in module_ids.MODULE_IDS
+    rpc: str
+    request: Callable[[], dict] = field(repr=False)
+
+
+TASKS = {
+    t.rpc.replace("TaskPredict", ""): t
+    for t in [
+        BenchTask("Sentiment", "SentimentTaskPredict", lambda: {"text_in": TEXT}),
+        BenchTask(
+            "Summarization", "SummarizationTaskPredict", lambda: {"text_in": TEXT * 8}
+        ),
+        BenchTask(
+            "TextGeneration", "TextGenerationTaskPredict", lambda: {"text_in": TEXT}
+        ),
+        BenchTask(
+            "TextGeneration",
+            "ServerStreamingTextGenerationTaskPredict",
+            lambda: {"text_in": TEXT},
+        ),
+        BenchTask(
+            "Conversational", "ConversationalTaskPredict", lambda: {"text_in": TEXT}
+        ),
+        BenchTask("Embeddings", "EmbeddingsTaskPredict", lambda: {"text_in": TEXT}),
+        BenchTask(
+            "SentenceSimilarity",
+            "SentenceSimilarityTaskPredict",
+            lambda: {"sentences": [TEXT, TEXT.upper(), TEXT[::-1]]},
+        ),
+        BenchTask(
+            "ImageClassification",
+            "ImageClassificationTaskPredict",
+            lambda: {"image_bytes": _png()},
+        ),
+        BenchTask(
+            "ImageClassificationBatch",
+            "ImageClassificationBatchTaskPredict",
+            lambda: {"images_bytes": [_png()] * 4},
+        ),
+        BenchTask(
+            "ObjectDetection",
+            "ObjectDetectionTaskPredict",
+            lambda: {"image_bytes": _png()},
+        ),
+        BenchTask(
+            "ObjectDetectionBatch",
+            "ObjectDetectionBatchTaskPredict",
+            lambda: {"images_bytes": [_png()] * 4},
+        ),
+        BenchTask(
+            "ImageSegmentation",
+            "ImageSegmentationTaskPredict",
+            lambda: {"image_bytes": _png(), "mask_format": "label_map"},
+        ),
+    ]
+}
+
+
+def _model_id(module: str) -> str:
+    return f"bench-{module.lower()}"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("", 0))
+        return s.getsockname()[1]
+
+
+def prepare_models(tasks: List[str], models_dir: str) -> str:
+    """Save the tiny models (once) and a fresh local_models_dir for tasks.
+    Returns the local_models_dir."""
+    local_models_dir = os.path.join(models_dir, "caikit")
+    shutil.rmtree(local_models_dir, ignore_errors=True)
+    for module in sorted({TASKS[t].module for t in tasks}):
+        hf_model = save_tiny_model(module, os.path.join(models_dir, "hf", module))
+        model_dir = os.path.join(local_models_dir, _model_id(module))
+        os.makedirs(model_dir)
+        with open(os.path.join(model_dir, "config.yml"), "w", encoding="utf-8") as f:
+            yaml.safe_dump(
+                {"module_id": module_ids.MODULE_IDS[module], "hf_model": hf_model}, f
+            )
+    return local_models_dir
+
+
+def start_backend(
+    local_models_dir: str, port: int, workers: int, log_path: str
+) -> subprocess.Popen:
+    """Start app.py --backend (offline) on port, logging to log_path"""
+    env = dict(
+        os.environ,
+        RUNTIME_LOCAL_MODELS_DIR=local_models_dir,
+        RUNTIME_PORT=str(port),
+        RUNTIME_FIND_AVAILABLE_PORT="false",
+        RUNTIME_METRICS_PORT=str(_free_port()),
+        HF_HUB_OFFLINE="1",
+        TRANSFORMERS_OFFLINE="1",
+    )
+    with open(log_path, "w", encoding="utf-8") as log_file:
+        return subprocess.Popen(
+            [sys.executable, "app.py", "--backend", "--workers", str(workers)],
+            cwd=APP_DIR,
+            env=env,
+            stdout=log_file,
+            stderr=subprocess.STDOUT,
+        )
+
+
+def wait_serving(
+    channel: grpc.Channel, backend: subprocess.Popen, timeout_s: float
+) -> None:
+    """Wait for the backend health check to report SERVING"""
+    health = health_pb2_grpc.HealthStub(channel)
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        if backend.poll() is not None:
+            raise RuntimeError(f"Backend exited with code {backend.returncode}")
+        try:
+            response = health.Check(health_pb2.HealthCheckRequest(), timeout=1)
+            if response.status == health_pb2.HealthCheckResponse.SERVING:
+                return
+        except grpc.RpcError:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"Backend not serving after {timeout_s}s")
+
+
+def _rpc_callables(channel: grpc.Channel) -> Dict[str, tuple]:
+    """Map inference RPC names to (request class, callable, server_streaming) using
+    server reflection (like the UI client)"""
+    reflection_db = ProtoReflectionDescriptorDatabase(channel)
+    desc_pool = DescriptorPool(reflection_db)
+    factory = MessageFactory(desc_pool)
+    rpcs = {}
+    for service_name in reflection_db.get_services():
+        if not service_name.startswith("caikit.runtime."):
+            continue
+        for method in desc_pool.FindServiceByName(service_name).methods:
+            request = factory.GetPrototype(method.input_type)
+            response = factory.GetPrototype(method.output_type)
+            multi_callable = (
+                channel.unary_stream if method.server_streaming else channel.unary_unary
+            )
+            rpcs[method.name] = (
+                request,
+                multi_callable(
+                    f"/{service_name}/{method.name}",
+                    request_serializer=request.SerializeToString,
+                    response_deserializer=response.FromString,
+                ),
+                method.server_streaming,
+            )
+    return rpcs
+
+
+def _summary_ms(seconds: List[float]) -> Optional[dict]:
+    if not seconds:
+        return None
+    ms = numpy.asarray(seconds) * 1000
+    summary = {f"p{p}": round(float(numpy.percentile(ms, p)), 3) for p in PERCENTILES}
+    summary["mean"] = round(float(ms.mean()), 3)
+    summary["max"] = round(float(ms.max()), 3)
+    return summary
+
+
+def run_load(
+    call: Callable,
+    request,
+    model_id: str,
+    streaming: bool,
+    concurrency: int,
+    duration_s: float,
+    rate: float = 0,
+) -> dict:
+    """Send requests from concurrency threads for duration_s.
+
+    With rate 0, each thread sends its next request when the last one completes
+    (closed loop). Otherwise requests are scheduled at rate per second (open loop)
+    and latency is measured from the scheduled time, so queueing counts.
+    """
+    metadata = [("mm-model-id", model_id)]
+    latencies: List[float] = []
+    first_response: List[float] = []
+    errors: Counter = Counter()
+    lock = threading.Lock()
+    schedule = itertools.count()
+    start = time.perf_counter()
+    end = start + duration_s
+
+    def send() -> None:
+        while True:
+            if rate:
+                sent = start + next(schedule) / rate
+                if sent >= end:
+                    return
+                time.sleep(max(0.0, sent - time.perf_counter()))
+            else:
+                sent = time.perf_counter()
+                if sent >= end:
+                    return
+            first = None
+            try:
+                if streaming:
+                    for _ in call(request, metadata=metadata):
+                        first = first or time.perf_counter() - sent
+                else:
+                    call(request, metadata=metadata)
+            except grpc.RpcError as e:
+                with lock:
+                    errors[e.code().name] += 1
+                continue
+            latency = time.perf_counter() - sent
+            with lock:
+                latencies.append(latency)
+                if first is not None:
+                    first_response.append(first)
+
+    threads = [threading.Thread(target=send) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    result = {
+        "requests": len(latencies),
+        "errors": dict(errors),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 3),
+        "latency_ms": _summary_ms(latencies),
+    }
+    if streaming:
+        result["first_response_ms"] = _summary_ms(first_response)
+    return result
+
+
+def run_benchmark(
+    tasks: List[str],
+    models_dir: str,
+    concurrency: int = 4,
+    duration_s: float = 10,
+    rate: float = 0,
+    warmup: int = 3,
+    workers: int = 1,
+    startup_timeout_s: float = 300,
+) -> dict:
+    """Start the backend with tiny models for tasks, load test each task in turn and
+    return the report (throughput and latency percentiles per task)"""
+    unknown = [t for t in tasks if t not in TASKS]
+    if unknown:
+        raise ValueError(f"Unknown tasks {unknown}. Expected some of {list(TASKS)}")
+
+    local_models_dir = prepare_models(tasks, models_dir)
+    port = _free_port()
+    log_path = os.path.join(models_dir, "backend.log")
+    backend = start_backend(local_models_dir, port, workers, log_path)
+    report = {
+        "started": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "settings": {
+            "concurrency": concurrency,
+            "duration_s": duration_s,
+            "rate": rate,
+            "warmup": warmup,
+            "workers": workers,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "tasks": {},
+        "failed": {},
+    }
+    try:
+        with grpc.insecure_channel(f"localhost:{port}") as channel:
+            wait_serving(channel, backend, startup_timeout_s)
+            rpcs = _rpc_callables(channel)
+            for name in tasks:
+                task = TASKS[name]
+                if task.rpc not in rpcs:
+                    report["failed"][name] = f"RPC {task.rpc} not found"
+                    continue
+                request_class, call, streaming = rpcs[task.rpc]
+                request = request_class(**task.request())
+                model_id = _model_id(task.module)
+                try:
+                    for _ in range(warmup):  # Also checks that the task works at all
+                        if streaming:
+                            list(call(request, metadata=[("mm-model-id", model_id)]))
+                        else:
+                            call(request, metadata=[("mm-model-id", model_id)])
+                except grpc.RpcError as e:
+                    report["failed"][name] = f"{e.code().name}: {e.details()}"
+                    continue
+                report["tasks"][name] = run_load(
+                    call,
+                    request,
+                    model_id,
+                    streaming,
+                    concurrency,
+                    duration_s,
+                    rate,
+                )
+    finally:
+        backend.terminate()
+        try:
+            backend.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            backend.kill()
+    return report
@@ -0,0 +1,323 @@
+# Copyright The Caikit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+# Standard
+from base64 import b64encode
+from fnmatch import fnmatch
+from io import BytesIO
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+import json
+import os
+import platform
+import timeit
+
+# Third Party
+from client.embeddings import Embeddings as EmbeddingsUI
+from client.image_segmentation import ImageSegmentation as ImageSegmentationUI
+from client.object_detection import ObjectDetection as ObjectDetectionUI
+from client.sentence_similarity import SentenceSimilarity as SentenceSimilarityUI
+from PIL import Image
+from runtime.data_model.embeddings import EmbeddingsPair, Result
+from runtime.data_model.image_segmentation import ImageSegmentationResult, Mask
+from runtime.data_model.object_detection import (
+    Box,
+    ObjectDetected,
+    ObjectDetectionResult,
+)
+from runtime.embeddings.embeddings import Embeddings
+from runtime.hf_base import HFBase
+from runtime.tasks.image_segmentation import ImageSegmentation
+from transformers import BatchEncoding
+import numpy
+import torch
+
+# Local
+from caikit.core import ModuleBase
+
+# Microbenchmarks of the pre- and post-processing around the models (image decoding
+# and encoding, result conversion and serialization, and the UI client's response
+# handling). Each case is a setup function returning the function to time.
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+DEFAULT_THRESHOLD = 1.25  # Fail when a case is 25% slower than its baseline
+
+WIDTH, HEIGHT = 640, 480
+TOKENS, HIDDEN = 128, 768
+SEGMENTS = 20
+OBJECTS = 20
+
+CASES: Dict[str, Callable[[], Callable[[], object]]] = {}
+
+
+def case(name: str):
+    """Register a benchmark setup function under name"""
+
+    def register(setup):
+        CASES[name] = setup
+        return setup
+
+    return register
+
+
+def _rng():
+    return numpy.random.default_rng(0)  # Same inputs every run
+
+
+def _image_array() -> numpy.ndarray:
+    return _rng().integers(0, 256, (HEIGHT, WIDTH, 3), dtype=numpy.uint8)
+
+
+def _png() -> bytes:
+    image_bytes = BytesIO()
+    Image.fromarray(_image_array()).save(image_bytes, "PNG")
+    return image_bytes.getvalue()
+
+
+def _rectangles(count: int) -> List[tuple]:
+    """(xmin, ymin, xmax, ymax) boxes inside the image"""
+    rng = _rng()
+    boxes = []
+    for _ in range(count):
+        x, y = int(rng.integers(0, WIDTH // 2)), int(rng.integers(0, HEIGHT // 2))
+        boxes.append((x, y, x + WIDTH // 4, y + HEIGHT // 4))
+    return boxes
+
+
+def _canned(response) -> dict:
+    """UI client request/predict callables that return response without a server"""
+    return {
+        "request": lambda **kwargs: kwargs,
+        "predict": lambda request, metadata: response,
+    }
+
+
+# Server side
+
+
+@case("server.get_image_bytes.base64")
+def _get_image_bytes():
+    encoded = b64encode(_png()).decode()
+    return lambda: HFBase.get_image_bytes(encoded).load()
+
+
+@case("server.get_image.raw_bytes")
+def _get_image():
+    png = _png()
+    return lambda: HFBase.get_image(image_bytes=png).load()
+
+
+@case("server.encode_image.mask")
+def _encode_image():
+    mask = Image.fromarray((_image_array()[:, :, 0] > 127).astype(numpy.uint8) * 255)
+    return lambda: HFBase.encode_image(mask)
+
+
+def _embeddings(output_format: str):
+    hidden = torch.from_numpy(_rng().standard_normal((1, TOKENS, HIDDEN), "float32"))
+    model_input = BatchEncoding(
+        {
+            "input_ids": torch.arange(TOKENS)[None],
+            "attention_mask": torch.ones(1, TOKENS, dtype=torch.long),
+        }
+    )
+    module = Embeddings(
+        tokenizer=lambda text, return_tensors: model_input,
+        model=lambda **_: SimpleNamespace(last_hidden_state=hidden),
+        output_format=output_format,
+    )
+    # Everything after the forward pass, through serializing the response
+    return lambda: module.run("text").to_proto().SerializeToString()
+
+
+@case("server.embeddings.lists")
+def _embeddings_lists():
+    return _embeddings("")
+
+
+@case("server.embeddings.packed_float32")
+def _embeddings_packed():
+    return _embeddings("float32")
+
+
+def _image_segmentation(mask_format: str):
+    results = []
+    for i, (x0, y0, x1, y1) in enumerate(_rectangles(SEGMENTS)):
+        mask = numpy.zeros((HEIGHT, WIDTH), dtype=numpy.uint8)
+        mask[y0:y1, x0:x1] = 255
+        results.append(
+            {
+                "label": f"label{i}",
+                "score": 0.5 + i / 100,
+                "mask": Image.fromarray(mask),
+            }
+        )
+    module = ImageSegmentation.__new__(ImageSegmentation)
+    ModuleBase.__init__(module)
+    module.pipe = lambda image, threshold: results  # No model, just the results
+    module.mask_format = mask_format
+    module.mask_scale = 1.0
+    png = _png()
+    return lambda: module.run(image_bytes=png).to_proto().SerializeToString()
+
+
+@case("server.image_segmentation.png")
+def _image_segmentation_png():
+    return _image_segmentation("png")
+
+
+@case("server.image_segmentation.rle")
+def _image_segmentation_rle():
+    return _image_segmentation("rle")
+
+
+@case("server.image_segmentation.label_map")
+def _image_segmentation_label_map():
+    return _image_segmentation("label_map")
+
+
+# UI client side (response handling, with canned responses)
+
+
+def _embeddings_result(rows: int, packed: bool):
+    embeddings = _rng().standard_normal((rows, HIDDEN), "float32")
+    if packed:
+        result = Result(
+            packed=HFBase.pack_array(embeddings, "float32"), inputs=list(range(rows))
+        )
+    else:
+        result = Result(
+            [
+                EmbeddingsPair(input=i, output=e)
+                for i, e in enumerate(embeddings.tolist())
+            ]
+        )
+    return result.to_proto()
+
+
+@case("client.embeddings.packed")
+def _client_embeddings_packed():
+    ui = EmbeddingsUI(**_canned(_embeddings_result(TOKENS, packed=True)))
+    return lambda: ui.fn("model", "text")
+
+
+@case("client.embeddings.lists")
+def _client_embeddings_lists():
+    ui = EmbeddingsUI(**_canned(_embeddings_result(TOKENS, packed=False)))
+    return lambda: ui.fn("model", "text")
+
+
+@case("client.sentence_similarity.packed")
+def _client_sentence_similarity():
+    ui = SentenceSimilarityUI(**_canned(_embeddings_result(3, packed=True)))
+    return lambda: ui.fn("model", "a", "b", "c")
+
+
+@case("client.image_segmentation.label_map")
+def _client_image_segmentation():
+    label_map = numpy.zeros((HEIGHT, WIDTH), dtype=numpy.uint8)
+    for i, (x0, y0, x1, y1) in enumerate(_rectangles(SEGMENTS)):
+        label_map[y0:y1, x0:x1] = i + 1
+    response = ImageSegmentationResult(
+        [Mask(label=f"label{i}", score=0.5) for i in range(SEGMENTS)],
+        label_map=label_map.tobytes(),
+        width=WIDTH,
+        height=HEIGHT,
+    ).to_proto()
+    ui = ImageSegmentationUI(**_canned(response))
+    image_array = _image_array()
+    return lambda: ui.fn("model", image_array)
+
+
+@case("client.object_detection")
+def _client_object_detection():
+    response = ObjectDetectionResult(
+        [
+            ObjectDetected(label=f"label{i % 5}", score=0.5, box=Box(*box))
+            for i, box in enumerate(_rectangles(OBJECTS))
+        ]
+    ).to_proto()
+    ui = ObjectDetectionUI(**_canned(response))
+    image_array = _image_array()
+    return lambda: ui.fn("model", image_array)
+
+
+def measure(fn: Callable[[], object], repeat: int = 5) -> float:
+    """Best seconds per call over repeat runs of at least 0.2s each"""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+    }
+
+
+def load_baseline(path: str) -> dict:
+    if not os.path.exists(path):
+        return {"cases": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def run_suite(
+    patterns: Optional[List[str]] = None,
+    baseline_path: str = BASELINE_PATH,
+    threshold: float = DEFAULT_THRESHOLD,
+    save_baseline: bool = False,
+    repeat: int = 5,
+) -> dict:
+    """Time the cases matching patterns (fnmatch, default all) and compare each
+    with its baseline. A case regresses when it is more than threshold times its
+    baseline time (a baseline case may set its own "threshold"). Cases without a
+    baseline are listed as missing. With save_baseline, the measured times replace
+    those cases' baselines."""
+    baseline = load_baseline(baseline_path)
+    report = {
+        "environment": environment(),
+        "baseline_environment": baseline.get("environment"),
+        "cases": {},
+        "regressions": [],
+        "missing": [],
+    }
+    measured = {}
+    for name, setup in CASES.items():
+        if patterns and not any(fnmatch(name, p) for p in patterns):
+            continue
+        seconds = measured[name] = measure(setup(), repeat)
+        result = {"us_per_call": round(seconds * 1e6, 3)}
+        expected = baseline["cases"].get(name)
+        if expected:
+            ratio = seconds / expected["seconds"]
+            limit = expected.get("threshold", threshold)
+            result["baseline_us_per_call"] = round(expected["seconds"] * 1e6, 3)
+            result["ratio"] = round(ratio, 3)
+            if ratio > limit:
+                report["regressions"].append(name)
+        else:
+            report["missing"].append(name)
+        report["cases"][name] = result
+
+    if save_baseline:
+        for name, seconds in measured.items():
+            baseline["cases"].setdefault(name, {})["seconds"] = seconds
+        baseline["environment"] = environment()
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+    return report
@@ -0,0 +1,205 @@
+# Copyright The Caikit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+# Standard
+from typing import Callable, Dict
+import os
+import string
+
+# Third Party
+from transformers import (
+    BertConfig,
+    BertForSequenceClassification,
+    BertModel,
+    BertTokenizer,
+    DetrConfig,
+    DetrForSegmentation,
+    DetrImageProcessor,
+    GPT2Config,
+    GPT2LMHeadModel,
+    ResNetConfig,
+    T5Config,
+    T5ForConditionalGeneration,
+    ViTConfig,
+    ViTForImageClassification,
+    ViTImageProcessor,
+    YolosConfig,
+    YolosForObjectDetection,
+    YolosImageProcessor,
+)
+import torch
+
+# Small random-weight models saved with save_pretrained(), so the benchmark runs
+# offline and measures the serving stack (not model quality).
+# Keyed by the module class name (see module_ids.MODULE_IDS).
+
+SPECIAL_TOKENS = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"]
+PAD, UNK, CLS, SEP, MASK = range(len(SPECIAL_TOKENS))
+LABELS = {0: "NEGATIVE", 1: "POSITIVE"}
+MAX_POSITIONS = 1024
+IMAGE_SIZE = 64
+
+
+def _save_tokenizer(path: str) -> int:
+    """Save a lowercase word-piece tokenizer that spells any word with characters.
+    Returns the vocab size."""
+    chars = string.ascii_lowercase + string.digits
+    vocab = (
+        SPECIAL_TOKENS + list(chars + string.punctuation) + [f"##{c}" for c in chars]
+    )
+    vocab_file = os.path.join(path, "vocab.txt")
+    with open(vocab_file, "w", encoding="utf-8") as f:
+        f.write("\n".join(vocab) + "\n")
+    tokenizer = BertTokenizer(
+        vocab_file,
+        bos_token="[CLS]",
+        eos_token="[SEP]",
+        model_max_length=MAX_POSITIONS,
+    )
+    tokenizer.save_pretrained(path)
+    return len(vocab)
+
+
+def _bert_config(vocab_size: int) -> BertConfig:
+    return BertConfig(
+        vocab_size=vocab_size,
+        hidden_size=32,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        intermediate_size=64,
+        max_position_embeddings=MAX_POSITIONS,
+        pad_token_id=PAD,
+        id2label=LABELS,
+    )
+
+
+def _gpt2(path: str) -> None:
+    config = GPT2Config(
+        vocab_size=_save_tokenizer(path),
+        n_positions=MAX_POSITIONS,
+        n_embd=32,
+        n_layer=2,
+        n_head=2,
+        bos_token_id=CLS,
+        eos_token_id=SEP,
+        pad_token_id=PAD,
+    )
+    GPT2LMHeadModel(config).save_pretrained(path)
+
+
+def _t5(path: str) -> None:
+    config = T5Config(
+        vocab_size=_save_tokenizer(path),
+        d_model=32,
+        d_kv=16,
+        d_ff=64,
+        num_layers=2,
+        num_heads=2,
+        pad_token_id=PAD,
+        eos_token_id=SEP,
+        decoder_start_token_id=PAD,
+    )
+    T5ForConditionalGeneration(config).save_pretrained(path)
+
+
+def _bert(path: str) -> None:
+    BertModel(_bert_config(_save_tokenizer(path))).save_pretrained(path)
+
+
+def _bert_classifier(path: str) -> None:
+    config = _bert_config(_save_tokenizer(path))
+    BertForSequenceClassification(config).save_pretrained(path)
+
+
+def _vit(path: str) -> None:
+    config = ViTConfig(
+        image_size=IMAGE_SIZE,
+        patch_size=16,
+        hidden_size=32,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        intermediate_size=64,
+        id2label=LABELS,
+    )
+    ViTForImageClassification(config).save_pretrained(path)
+    ViTImageProcessor(size={"height": IMAGE_SIZE, "width": IMAGE_SIZE}).save_pretrained(
+        path
+    )
+
+
+def _yolos(path: str) -> None:
+    config = YolosConfig(
+        image_size=[IMAGE_SIZE, IMAGE_SIZE],
+        patch_size=16,
+        hidden_size=32,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        intermediate_size=64,
+        num_detection_tokens=10,
+        id2label=LABELS,
+    )
+    YolosForObjectDetection(config).save_pretrained(path)
+    size = {"shortest_edge": IMAGE_SIZE, "longest_edge": IMAGE_SIZE}
+    YolosImageProcessor(size=size).save_pretrained(path)
+
+
+def _detr_panoptic(path: str) -> None:
+    backbone = ResNetConfig(
+        embedding_size=8,
+        hidden_sizes=[8, 16, 32, 64],
+        depths=[1, 1, 1, 1],
+        layer_type="basic",
+        out_features=["stage1", "stage2", "stage3", "stage4"],
+    )
+    # The mask head needs d_model to be a multiple of 128 (for its group norms)
+    config = DetrConfig(
+        use_timm_backbone=False,
+        backbone_config=backbone,
+        d_model=128,
+        encoder_layers=1,
+        decoder_layers=1,
+        encoder_attention_heads=8,
+        decoder_attention_heads=8,
+        encoder_ffn_dim=128,
+        decoder_ffn_dim=128,
+        num_queries=10,
+        id2label=LABELS,
+    )
+    DetrForSegmentation(config).save_pretrained(path)
+    size = {"shortest_edge": IMAGE_SIZE, "longest_edge": IMAGE_SIZE}
+    DetrImageProcessor(format="coco_panoptic", size=size).save_pretrained(path)
+
+
+TINY_MODELS: Dict[str, Callable[[str], None]] = {
+    "Sentiment": _bert_classifier,
+    "Summarization": _t5,
+    "TextGeneration": _gpt2,
+    "Conversational": _gpt2,
+    "Embeddings": _bert,
+    "SentenceSimilarity": _bert,
+    "ImageClassification": _vit,
+    "ImageClassificationBatch": _vit,
+    "ObjectDetection": _yolos,
+    "ObjectDetectionBatch": _yolos,
+    "ImageSegmentation": _detr_panoptic,
+}
+
+
+def save_tiny_model(module_name: str, path: str, seed: int = 0) -> str:
+    """Save the tiny model for a module under path (once) and return path"""
+    if not os.path.exists(os.path.join(path, "config.json")):
+        os.makedirs(path, exist_ok=True)
+        torch.manual_seed(seed)  # Same weights every run
+        TINY_MODELS[module_name](path)
+    return path
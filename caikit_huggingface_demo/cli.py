@@ -15,11 +15,13 @@
 
 # Standard
 from pathlib import Path
+import json
 import os
 import shutil
 
 # Third Party
 import click
+import requests
 
 HOME = Path.home()
 path = f"{HOME}/.cache/huggingface"
@@ -63,9 +65,145 @@ def add():
     print("TODO: This will add models to the application")
 
 
+@click.command()
+@click.option(
+    "--task",
+    "tasks",
+    multiple=True,
+    help="Task to benchmark, e.g. Sentiment (repeatable, default: all tasks).",
+)
+@click.option("--concurrency", default=4, show_default=True, help="Client threads.")
+@click.option(
+    "--duration", default=10.0, show_default=True, help="Seconds to load each task."
+)
+@click.option(
+    "--rate",
+    default=0.0,
+    show_default=True,
+    help="Requests per second per task (0 sends as fast as the threads can).",
+)
+@click.option(
+    "--warmup", default=3, show_default=True, help="Unmeasured requests per task."
+)
+@click.option(
+    "--workers", default=1, show_default=True, help="Backend worker processes."
+)
+@click.option(
+    "--models-dir",
+    default=f"{HOME}/.cache/caikit_huggingface_demo/bench",
+    show_default=True,
+    help="Where the tiny random-weight models are generated (and reused).",
+)
+@click.option("--output", help="Also write the JSON report to this file.")
+def bench(tasks, concurrency, duration, rate, warmup, workers, models_dir, output):
+    """Load test the backend over gRPC with tiny local models (offline)"""
+    # Imported here so the other commands do not need torch and transformers
+    # Third Party
+    from benchmarks.load_test import TASKS, run_benchmark
+
+    report = run_benchmark(
+        list(tasks) or list(TASKS),
+        models_dir,
+        concurrency=concurrency,
+        duration_s=duration,
+        rate=rate,
+        warmup=warmup,
+        workers=workers,
+    )
+    report_json = json.dumps(report, indent=2)
+    print(report_json)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(report_json + "\n")
+
+
+@click.command()
+@click.option(
+    "--case",
+    "cases",
+    multiple=True,
+    help="Case name or pattern, e.g. 'client.*' (repeatable, default: all cases).",
+)
+@click.option(
+    "--threshold",
+    default=1.25,
+    show_default=True,
+    help="Fail when a case takes more than this times its baseline.",
+)
+@click.option(
+    "--baseline",
+    default=None,
+    help="Baseline JSON file (default: benchmarks/baselines.json).",
+)
+@click.option(
+    "--save-baseline", is_flag=True, help="Record the measured times as the baseline."
+)
+@click.option("--output", help="Also write the JSON report to this file.")
+def microbench(cases, threshold, baseline, save_baseline, output):
+    """Time the pre- and post-processing hot paths and compare with the baseline"""
+    # Imported here so the other commands do not need torch and transformers
+    # Third Party
+    from benchmarks.micro import BASELINE_PATH, run_suite
+
+    report = run_suite(
+        list(cases),
+        baseline_path=baseline or BASELINE_PATH,
+        threshold=threshold,
+        save_baseline=save_baseline,
+    )
+    report_json = json.dumps(report, indent=2)
+    print(report_json)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(report_json + "\n")
+    if save_baseline:
+        return
+    if report["regressions"]:
+        raise click.ClickException(f"Slower than baseline: {report['regressions']}")
+    if report["missing"]:
+        raise click.ClickException(
+            f"No baseline for: {report['missing']}. Record one with --save-baseline."
+        )
+
+
+@click.command()
+@click.option(
+    "--url",
+    default="http://localhost:8087",
+    show_default=True,
+    help="Admin endpoint of the backend (admin.port in config.yml).",
+)
+@click.option(
+    "--top",
+    default=10,
+    show_default=True,
+    help="Allocation sites to list when tracemalloc tracing is on.",
+)
+@click.option(
+    "--tracemalloc",
+    type=click.Choice(["start", "stop"]),
+    help="Start (or stop) tracing Python allocations in the backend first.",
+)
+def memory(url, top, tracemalloc):
+    """Report the memory used by each model loaded in a running backend"""
+    try:
+        if tracemalloc:
+            requests.post(
+                f"{url}/memory/tracemalloc/{tracemalloc}", timeout=30
+            ).raise_for_status()
+        response = requests.get(f"{url}/memory", params={"top": top}, timeout=60)
+        response.raise_for_status()
+    except requests.RequestException as e:
+        raise click.ClickException(f"Could not get the memory report: {e}") from e
+    print(json.dumps(response.json(), indent=2))
+
+
 cli.add_command(clean)
 cli.add_command(start)
 cli.add_command(setup)
+cli.add_command(bench)
+cli.add_command(microbench)
+cli.add_command(memory)
 
 if __name__ == "__main__":
     cli()
@@ -35,28 +35,44 @@ from .text_generation import TextGeneration
 from caikit.runtime.service_factory import ServicePackage
 
 
-def add_tab(ui_class, client_stub, service_prefix, desc_pool, module_models):
-    """Adds a tab if there are models loaded for this module.
-    returns true if tab added else false (no models)
-    """
-    class_name = ui_class.__name__
-    task = f"{class_name}Task"
-    method_name = f"{task}Predict"
+def get_rpc(client_stub, service_prefix, desc_pool, task, rpc_prefix=""):
+    """Returns (request class, stub method) for a task RPC or (None, None) if not found."""
+    method_name = f"{rpc_prefix}{task}Predict"
     if hasattr(client_stub, method_name):
         method = getattr(client_stub, method_name)
     else:
         print(f"Failed to find expected method: {method_name}")
-        return False
+        return None, None
 
-    request_name = f"{service_prefix}.{task}Request"
+    request_name = f"{service_prefix}.{rpc_prefix}{task}Request"
     try:
         request_desc = desc_pool.FindMessageTypeByName(request_name)
     except KeyError as e:
         print(f"Find request error: {e}")
+        return None, None
+
+    return MessageFactory(desc_pool).GetPrototype(request_desc), method
+
+
+def add_tab(ui_class, client_stub, service_prefix, desc_pool, module_models):
+    """Adds a tab if there are models loaded for this module.
+    returns true if tab added else false (no models)
+    """
+    class_name = ui_class.__name__
+    task = f"{class_name}Task"
+    request, method = get_rpc(client_stub, service_prefix, desc_pool, task)
+    if not method:
         return False
 
-    request = MessageFactory(desc_pool).GetPrototype(request_desc)
     models = module_models.get(module_ids.MODULE_IDS[class_name])
+    if getattr(ui_class, "streaming", False):
+        # Optional server-streaming RPC (UI falls back to unary when missing)
+        stream_request, stream_method = get_rpc(
+            client_stub, service_prefix, desc_pool, task, rpc_prefix="ServerStreaming"
+        )
+        return ui_class.optional_tab(
+            models, request, method, stream_request, stream_method
+        )
     return ui_class.optional_tab(models, request, method)
 
 
@@ -12,6 +12,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License
 
+# Standard
+import uuid
+
 # Third Party
 import gradio as gr
 import grpc
@@ -22,13 +25,17 @@ class Conversational:
         self.request = request
         self.predict = predict
 
-    def fn(self, model, text_in, chat):
+    def fn(self, model, text_in, chat, session_id):
+        # The server keeps the history for this session id, so only send the new input
+        session_id = session_id or str(uuid.uuid4())
+        chat = chat or []
         if text_in:
             response = self.predict(
-                self.request(text_in=text_in), metadata=[("mm-model-id", model)]
+                self.request(text_in=text_in, session_id=session_id),
+                metadata=[("mm-model-id", model)],
             ).text
             chat.append((text_in, response))
-        return "", chat  # '' is to clear inputs
+        return "", chat, session_id  # '' is to clear inputs
 
     @classmethod
     def optional_tab(cls, models, request, predict):
@@ -43,19 +50,26 @@ class Conversational:
                     label="Model ID", choices=models, value=models[0]
                 )
                 outputs = gr.Chatbot()
+                session_id = gr.State()
                 inputs = gr.Textbox(
                     label="Input Text (hit enter to send)",
                     placeholder=f"Enter input text for {tab}",
                 )
                 inputs.submit(
                     this.fn,
-                    [model_choice, inputs, outputs],
-                    [inputs, outputs],
+                    [model_choice, inputs, outputs, session_id],
+                    [inputs, outputs, session_id],
                     api_name=tab,
                 )
 
+                # Clearing (or switching models) starts a new server-side session
                 clear = gr.Button("Clear")
-                clear.click(lambda: None, None, outputs, queue=False)
+                clear.click(
+                    lambda: (None, None), None, [outputs, session_id], queue=False
+                )
+                model_choice.change(
+                    lambda: (None, None), None, [outputs, session_id], queue=False
+                )
 
                 print(f"✅️  {tab} tab is enabled!")
                 return True
@@ -17,6 +17,19 @@ import gradio as gr
 import numpy
 import pandas
 
+# Packed tensor formats (little-endian) sent by the backend
+PACKED_DTYPES = {"float32": "<f4", "float16": "<f2", "int8": "i1"}
+OUTPUT_FORMAT = "float32"  # Packed format requested by the UI
+
+
+def unpack(packed) -> numpy.ndarray:
+    """Read a PackedTensor message into a float32 numpy array (without per-float copies)"""
+    array = numpy.frombuffer(packed.data, dtype=PACKED_DTYPES[packed.dtype])
+    array = array.reshape(tuple(packed.shape)).astype(numpy.float32)
+    if packed.dtype == "int8":
+        array *= packed.scale
+    return array
+
 
 class Embeddings:
     def __init__(self, request, predict) -> None:
@@ -28,21 +41,18 @@ class Embeddings:
             return pandas.DataFrame()
 
         response = self.predict(
-            self.request(text_in=text_in), metadata=[("mm-model-id", model)]
+            self.request(text_in=text_in, output_format=OUTPUT_FORMAT),
+            metadata=[("mm-model-id", model)],
         )
-        columns = []
-        rows = []
-        for k in response.output:
-            columns.append(str(k.input))
-
-        for r, _ in enumerate(response.output[0].output):
-            row = []
-            for c, _ in enumerate(columns):
-                row.append(response.output[c].output[r])
-            rows.append(row)
+        if response.HasField("packed"):
+            columns = [str(i) for i in response.inputs]
+            embeddings = unpack(response.packed)
+        else:
+            columns = [str(k.input) for k in response.output]
+            embeddings = numpy.array([k.output for k in response.output])
 
-        ret = pandas.DataFrame(numpy.array(rows), columns=columns)
-        return ret
+        # One column per token, one row per embedding dimension
+        return pandas.DataFrame(embeddings.T, columns=columns)
 
     @classmethod
     def optional_tab(cls, models, request, predict):
@@ -19,6 +19,7 @@ import base64
 # Third Party
 from PIL import Image, ImageColor
 import gradio as gr
+import numpy
 
 # Color map for bbox color picking
 COLORS = list(ImageColor.colormap.keys())
@@ -37,24 +38,30 @@ class ImageSegmentation:
         with Image.fromarray(image_array) as image:
             image_as_bytes = BytesIO()
             image.save(image_as_bytes, "PNG")  # Save into PNG file-like object
-            encoded = base64.b64encode(
-                image_as_bytes.getvalue()
-            )  # Encode for transport
 
             response = self.predict(
-                self.request(encoded_bytes_or_url=encoded),
+                self.request(
+                    image_bytes=image_as_bytes.getvalue(),  # No base64
+                    mask_format="label_map",  # One uint8 map instead of a PNG per mask
+                ),
                 metadata=[("mm-model-id", model)],
             )
 
-            results = list(response.objects)
+            label_map = None
+            if response.label_map:
+                label_map = numpy.frombuffer(response.label_map, dtype=numpy.uint8)
+                label_map = label_map.reshape(response.height, response.width)
+
+            # Keep the response index (label_map value - 1) while sorting
+            results = list(enumerate(response.objects))
             results.sort(
-                key=lambda c: c.score, reverse=True
+                key=lambda c: c[1].score, reverse=True
             )  # Sort so numbering will be in desc score order
 
             labels = {}
             counter = {}
             gallery = []
-            for result in results:
+            for index, result in results:
                 label = result.label
                 counter[label] = (
                     counter.get(label, 0) + 1
@@ -64,10 +71,15 @@ class ImageSegmentation:
                 )  # Append counter when repeated
                 labels[key] = result.score
 
-                with Image.open(BytesIO(base64.b64decode(result.mask))) as mask:
-                    mask = mask.convert("L")
-                    masked = image.copy()
-                    masked.putalpha(mask)
+                if label_map is not None:
+                    mask = Image.fromarray(
+                        ((label_map == index + 1) * 255).astype(numpy.uint8), "L"
+                    ).resize(image.size, Image.NEAREST)
+                else:  # Older servers only send PNG masks
+                    with Image.open(BytesIO(base64.b64decode(result.mask))) as png:
+                        mask = png.convert("L")
+                masked = image.copy()
+                masked.putalpha(mask)
                 gallery.append((masked, key))
 
         return labels, gallery
@@ -14,7 +14,6 @@
 
 # Standard
 from io import BytesIO
-import base64
 
 # Third Party
 from PIL import Image, ImageColor, ImageDraw, ImageFont
@@ -38,10 +37,9 @@ class ObjectDetection:
         image = Image.fromarray(image_array)
         image_as_bytes = BytesIO()
         image.save(image_as_bytes, "PNG")  # Save into PNG file-like object
-        encoded = base64.b64encode(image_as_bytes.getvalue())  # Encode for transport
 
         response = self.predict(
-            self.request(encoded_bytes_or_url=encoded),
+            self.request(image_bytes=image_as_bytes.getvalue()),  # Raw bytes, no base64
             metadata=[("mm-model-id", model)],
         )
 
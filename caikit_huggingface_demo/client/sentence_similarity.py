@@ -18,6 +18,9 @@ import gradio as gr
 import numpy
 import pandas
 
+# Local
+from .embeddings import OUTPUT_FORMAT, unpack
+
 
 class SentenceSimilarity:
     def __init__(self, request, predict) -> None:
@@ -27,28 +30,26 @@ class SentenceSimilarity:
     def fn(self, model, sentence_0, sentence_1, sentence_2):
         sentences = [sentence_0, sentence_1, sentence_2]
         response = self.predict(
-            self.request(sentences=sentences), metadata=[("mm-model-id", model)]
+            self.request(sentences=sentences, output_format=OUTPUT_FORMAT),
+            metadata=[("mm-model-id", model)],
         )
-        columns = []
-        rows = []
-        for k in response.output:
-            if k.input == 0:
-                columns.append(f"Source sentence: {sentences[k.input]}")
-            else:
-                columns.append(f"Sentence {k.input}: {sentences[k.input]}")
-
-        for r, _ in enumerate(response.output[0].output):
-            row = []
-            for c, _ in enumerate(columns):
-                row.append(response.output[c].output[r])
-            rows.append(row)
+        if response.HasField("packed"):
+            indexes = list(response.inputs)
+            embeddings = unpack(response.packed)
+        else:
+            indexes = [k.input for k in response.output]
+            embeddings = numpy.array([k.output for k in response.output])
 
-        embedding_0 = response.output[0].output
-        output_cos = {
-            columns[c]: util.cos_sim(embedding_0, response.output[c].output).item()
-            for c, v in enumerate(columns)
-        }
-        ret_embeddings = pandas.DataFrame(numpy.array(rows), columns=columns)
+        columns = [
+            f"Source sentence: {sentences[i]}"
+            if i == 0
+            else f"Sentence {i}: {sentences[i]}"
+            for i in indexes
+        ]
+        scores = util.cos_sim(embeddings[0], embeddings)[0]
+        output_cos = {columns[c]: scores[c].item() for c, _ in enumerate(columns)}
+        # One column per sentence, one row per embedding dimension
+        ret_embeddings = pandas.DataFrame(embeddings.T, columns=columns)
         return output_cos, ret_embeddings
 
     @classmethod
@@ -18,28 +18,43 @@ import grpc
 
 
 class TextGeneration:
-    def __init__(self, request, predict) -> None:
+    streaming = True  # Use the server-streaming RPC when available
+
+    def __init__(self, request, predict, stream_request=None, stream_predict=None):
         self.request = request
         self.predict = predict
+        self.stream_request = stream_request
+        self.stream_predict = stream_predict
 
     def fn(self, model, text_in):
         # False-y string doesn't work as required request param so '' --> ''
-        return (
-            self.predict(
-                self.request(text_in=text_in), metadata=[("mm-model-id", model)]
-            ).text
-            if text_in
-            else ""
-        )
+        if not text_in:
+            yield ""
+            return
+
+        metadata = [("mm-model-id", model)]
+        if not self.stream_predict:
+            yield self.predict(self.request(text_in=text_in), metadata=metadata).text
+            return
+
+        # Render the chunks as they arrive
+        text = ""
+        for chunk in self.stream_predict(
+            self.stream_request(text_in=text_in), metadata=metadata
+        ):
+            text += chunk.text
+            yield text
 
     @classmethod
-    def optional_tab(cls, models, request, predict):
+    def optional_tab(
+        cls, models, request, predict, stream_request=None, stream_predict=None
+    ):
         if not models:
             return False
 
         tab = cls.__name__  # tab name
         try:
-            this = cls(request, predict)
+            this = cls(request, predict, stream_request, stream_predict)
             with gr.Tab(tab):
                 model_choice = gr.Dropdown(
                     label="Model ID", choices=models, value=models[0]
@@ -21,6 +21,8 @@ CONVERSATIONAL = "BC008C71-A272-4858-9D43-7297B35ABAC4"
 OBJECT_DETECTION = "D4C4B6CF-E0C3-4B3F-A325-5071FB126773"
 IMAGE_SEGMENTATION = "D44941F7-6967-45ED-823B-C1070C9257F9"
 SENTENCE_SIMILARITY = "A2543F83-1520-416B-85E4-F2BCB6F63354"
+IMAGE_CLASSIFICATION_BATCH = "FB096D0D-6052-423C-A9FC-CB6EDD2D5E1D"
+OBJECT_DETECTION_BATCH = "EB40EDB4-B915-4522-8FC0-CB7FCD6F250F"
 
 MODULE_IDS = {
     "Sentiment": SENTIMENT,
@@ -32,4 +34,6 @@ MODULE_IDS = {
     "ObjectDetection": OBJECT_DETECTION,
     "ImageSegmentation": IMAGE_SEGMENTATION,
     "SentenceSimilarity": SENTENCE_SIMILARITY,
+    "ImageClassificationBatch": IMAGE_CLASSIFICATION_BATCH,
+    "ObjectDetectionBatch": OBJECT_DETECTION_BATCH,
 }
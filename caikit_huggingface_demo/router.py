@@ -0,0 +1,222 @@
+# Copyright The Caikit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+# Standard
+from concurrent import futures
+from typing import Collection, Dict, List, Optional
+import os
+import signal
+
+# Third Party
+from admin import serve_admin
+from google.protobuf import descriptor_pool
+from grpc_health.v1 import health, health_pb2_grpc
+from runtime.model_manager import LocalModelManager
+from workers import serve_worker_metrics
+import grpc
+
+# First Party
+import alog
+
+# Local
+from caikit.config import get_config
+from caikit.core import ModuleConfig
+from caikit.runtime.grpc_server import PROMETHEUS_METRICS_INTERCEPTOR
+from caikit.runtime.interceptors.caikit_runtime_server_wrapper import (
+    CaikitRuntimeServerWrapper,
+)
+from caikit.runtime.service_factory import ServicePackage
+from caikit.runtime.servicers.global_predict_servicer import GlobalPredictServicer
+
+log = alog.use_channel("ROUTER")
+
+MODEL_ID_KEY = GlobalPredictServicer.MODEL_MESH_MODEL_ID_KEY  # "mm-model-id"
+NO_DEADLINE_S = 1e9
+
+
+def isolated_models(local_models_dir: str) -> List[str]:
+    """Model ids in local_models_dir whose config.yml sets isolated_process: true"""
+    model_ids = []
+    if os.path.exists(local_models_dir):
+        for model_id in sorted(os.listdir(local_models_dir)):
+            try:
+                config = ModuleConfig.load(os.path.join(local_models_dir, model_id))
+            except Exception:  # pylint: disable=broad-exception-caught
+                continue  # Not a model (the model manager reports real failures)
+            if config.get("isolated_process", False):
+                model_ids.append(model_id)
+    return model_ids
+
+
+class ModelRouter(grpc.GenericRpcHandler):
+    """Forwards every RPC, as raw bytes with its metadata, deadline and
+    cancellation, to the backend for its mm-model-id (or the default backend).
+
+    The router does not deserialize messages or run models, so it stays cheap no
+    matter how slow the models behind it are. Calls wait for a backend that is
+    still starting (or restarting) instead of failing.
+    """
+
+    def __init__(self, routes: Dict[str, str], default_address: str) -> None:
+        self.channels = {
+            address: grpc.insecure_channel(address)
+            for address in {*routes.values(), default_address}
+        }
+        self.routes = {m: self.channels[a] for m, a in routes.items()}
+        self.default = self.channels[default_address]
+
+    def service(self, handler_call_details):
+        metadata = handler_call_details.invocation_metadata or ()
+        model_id = dict(metadata).get(MODEL_ID_KEY)
+        channel = self.routes.get(model_id, self.default)
+        method = handler_call_details.method
+        client_streaming, server_streaming = _streaming(method)
+
+        if client_streaming and server_streaming:
+            forward = channel.stream_stream(method)
+            return grpc.stream_stream_rpc_method_handler(self._stream(forward))
+        if client_streaming:
+            forward = channel.stream_unary(method)
+            return grpc.stream_unary_rpc_method_handler(self._unary(forward))
+        if server_streaming:
+            forward = channel.unary_stream(method)
+            return grpc.unary_stream_rpc_method_handler(self._stream(forward))
+        forward = channel.unary_unary(method)
+        return grpc.unary_unary_rpc_method_handler(self._unary(forward))
+
+    @staticmethod
+    def _unary(forward):
+        def call(request, context):
+            future = forward.future(request, **_call_options(context))
+            context.add_callback(future.cancel)
+            try:
+                response = future.result()
+            except grpc.RpcError as e:
+                _abort(context, e)
+            context.set_trailing_metadata(future.trailing_metadata() or ())
+            return response
+
+        return call
+
+    @staticmethod
+    def _stream(forward):
+        def call(request, context):
+            responses = forward(request, **_call_options(context))
+            context.add_callback(responses.cancel)
+            try:
+                yield from responses
+            except grpc.RpcError as e:
+                _abort(context, e)
+            context.set_trailing_metadata(responses.trailing_metadata() or ())
+
+        return call
+
+
+def _streaming(method: str):
+    """(client_streaming, server_streaming) for a "/package.Service/Method" path"""
+    try:
+        descriptor = descriptor_pool.Default().FindMethodByName(
+            method.lstrip("/").replace("/", ".")
+        )
+    except KeyError:
+        return False, False
+    return descriptor.client_streaming, descriptor.server_streaming
+
+
+def _call_options(context) -> dict:
+    metadata = [
+        (k, v)
+        for k, v in context.invocation_metadata()
+        if not k.startswith(":") and not k.startswith("grpc-") and k != "user-agent"
+    ]
+    # Calls without a deadline report an (effectively) infinite time remaining
+    remaining = context.time_remaining()
+    return {
+        "metadata": metadata,
+        "timeout": remaining if remaining < NO_DEADLINE_S else None,
+        "wait_for_ready": True,
+    }
+
+
+def _abort(context, error: grpc.RpcError) -> None:
+    if error.trailing_metadata():
+        context.set_trailing_metadata(error.trailing_metadata())
+    context.abort(error.code(), error.details())
+
+
+def _serve(server: grpc.Server) -> None:
+    """Start the server and block until SIGINT/SIGTERM stops it with the grace period"""
+    grace = get_config().runtime.server_shutdown_grace_period_seconds
+
+    def stop(*_):
+        server.stop(grace)
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    server.start()
+    server.wait_for_termination()
+
+
+def serve_router(
+    routes: Dict[str, str], default_address: str, index: Optional[int] = None
+) -> None:
+    """Run the router on the configured port until SIGINT/SIGTERM"""
+    config = get_config().runtime
+    if index is not None:
+        serve_worker_metrics(index)
+    server = grpc.server(
+        futures.ThreadPoolExecutor(max_workers=config.server_thread_pool_size),
+        handlers=(ModelRouter(routes, default_address),),
+        interceptors=(PROMETHEUS_METRICS_INTERCEPTOR,),
+    )
+    server.add_insecure_port(f"[::]:{config.port}")
+    print(f"▶️  Router (pid {os.getpid()}) serving on port {config.port}")
+    _serve(server)
+
+
+def serve_models(
+    inference_service: ServicePackage,
+    model_ids: Collection[str],
+    address: str,
+    index: int,
+) -> None:
+    """Load only model_ids and serve them with Caikit's inference servicer on a
+    local (unix socket) address until SIGINT/SIGTERM"""
+    metrics_port = serve_worker_metrics(index)
+    admin_port = serve_admin(index)
+    model_manager = LocalModelManager(model_ids)  # Before the servicer gets it
+    config = get_config().runtime
+    server = grpc.server(
+        futures.ThreadPoolExecutor(max_workers=config.server_thread_pool_size),
+        interceptors=(PROMETHEUS_METRICS_INTERCEPTOR,),
+    )
+    server = CaikitRuntimeServerWrapper(
+        server=server,
+        global_predict=GlobalPredictServicer(inference_service).Predict,
+        intercepted_svc_package=inference_service,
+    )
+    inference_service.registration_function(inference_service.service, server)
+    health_pb2_grpc.add_HealthServicer_to_server(health.HealthServicer(), server)
+    server.add_insecure_port(address)
+    log.info(
+        "<RTR41826301I>",
+        "Serving %s at %s (pid %d, metrics port %s, admin port %s, ready: %s)",
+        sorted(model_manager.loaded_models) or sorted(model_manager.model_paths),
+        address,
+        os.getpid(),
+        metrics_port,
+        admin_port,
+        model_manager.ready.is_set(),
+    )
+    _serve(server)
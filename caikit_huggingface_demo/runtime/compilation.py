@@ -0,0 +1,128 @@
+# Copyright The Caikit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+# Standard
+from dataclasses import dataclass
+from typing import Callable
+import functools
+import time
+
+# Third Party
+import torch
+
+# First Party
+import alog
+
+# Local
+from caikit.core import ModuleConfig
+
+log = alog.use_channel("COMPILE")
+
+COMPILE_MODES = ("none", "torch_compile")
+ATTENTION_MODES = ("default", "bettertransformer")
+
+
+@dataclass(frozen=True)
+class CompileOptions:
+    """Model config compile and attention settings (hashable for registry keys)"""
+
+    compile: str = "none"  # torch_compile: torch.compile the model forward
+    attention: str = "default"  # bettertransformer: fused attention fastpath
+
+    @classmethod
+    def from_config(cls, model_config_path) -> "CompileOptions":
+        config = ModuleConfig.load(model_config_path)
+        options = cls(
+            compile=config.get("compile", "none"),
+            attention=config.get("attention", "default"),
+        )
+        if options.compile not in COMPILE_MODES:
+            raise ValueError(
+                f"Unsupported compile '{options.compile}'. Expected one of {COMPILE_MODES}"
+            )
+        if options.attention not in ATTENTION_MODES:
+            raise ValueError(
+                f"Unsupported attention '{options.attention}'. "
+                f"Expected one of {ATTENTION_MODES}"
+            )
+        return options
+
+    @property
+    def enabled(self) -> bool:
+        return self != CompileOptions()
+
+
+def apply(model, options: CompileOptions):
+    """Apply options to a loaded model. Anything unsupported stays eager."""
+    if options.attention == "bettertransformer":
+        try:
+            model = model.to_bettertransformer()  # Requires the optimum package
+        except (ImportError, NotImplementedError, ValueError) as e:
+            log.warning(
+                "<CMP40982311W>",
+                "BetterTransformer is not available for %s, using default attention: %s",
+                type(model).__name__,
+                e,
+            )
+    if options.compile == "torch_compile":
+        model.forward = _with_eager_fallback(model, model.forward)
+    return model
+
+
+def _with_eager_fallback(model, eager_forward: Callable) -> Callable:
+    """torch.compile eager_forward, going back to eager_forward for good if compiling
+    a call fails (e.g. an unsupported op or a failed recompile) but the eager call
+    works. Other errors (e.g. bad inputs) are raised and keep compilation on."""
+    compiled_forward = torch.compile(eager_forward, dynamic=True)
+    state = {"failed": False}
+
+    @functools.wraps(eager_forward)
+    def forward(*args, **kwargs):
+        if state["failed"]:
+            return eager_forward(*args, **kwargs)
+        try:
+            return compiled_forward(*args, **kwargs)
+        # pylint: disable-next=protected-access
+        except torch._dynamo.exc.TorchDynamoException as e:
+            # Also raised for inputs the model rejects, so only fall back for good
+            # once the eager call works
+            result = eager_forward(*args, **kwargs)
+            state["failed"] = True
+            log.warning(
+                "<CMP40982312W>",
+                "torch.compile failed for %s, falling back to eager: %s",
+                type(model).__name__,
+                e,
+            )
+            return result
+
+    return forward
+
+
+def warmup(model, options: CompileOptions, run: Callable[[], object]) -> None:
+    """Call run() (a tiny inference) at load time so compilation does not happen on
+    the first user request. Done once per (shared) model."""
+    if not options.enabled or getattr(model, "_caikit_warmed_up", False):
+        return
+    start = time.monotonic()
+    with torch.inference_mode():
+        run()
+    model._caikit_warmed_up = True  # pylint: disable=protected-access
+    log.info(
+        "<CMP40982313I>",
+        "Warmed up %s (%s) in %.2fs",
+        type(model).__name__,
+        options,
+        time.monotonic() - start,
+    )
@@ -13,8 +13,17 @@
 # limitations under the License
 
 # Local
-from .classification import ClassificationPrediction, ClassInfo
-from .embeddings import Result
+from .classification import (
+    ClassificationBatchPrediction,
+    ClassificationPrediction,
+    ClassInfo,
+)
+from .embeddings import PackedTensor, Result
 from .image_segmentation import ImageSegmentationResult, Mask
-from .object_detection import Box, ObjectDetected, ObjectDetectionResult
+from .object_detection import (
+    Box,
+    ObjectDetected,
+    ObjectDetectionBatchResult,
+    ObjectDetectionResult,
+)
 from .results import Text
@@ -33,3 +33,10 @@ class ClassificationPrediction(DataObjectBase):
     """The result of a classification prediction."""
 
     classes: List[ClassInfo]
+
+
+@dataobject
+class ClassificationBatchPrediction(DataObjectBase):
+    """The classification predictions for a batch of inputs (in input order)."""
+
+    results: List[ClassificationPrediction]
@@ -28,8 +28,20 @@ class EmbeddingsPair(DataObjectBase):
     output: List[float]
 
 
+@dataobject
+class PackedTensor(DataObjectBase):
+    """A tensor packed into one contiguous little-endian buffer (row-major)"""
+
+    data: bytes
+    dtype: str  # float32, float16 or int8
+    shape: List[int]
+    scale: float  # int8 only: value = int8 * scale
+
+
 @dataobject
 class Result(DataObjectBase):
-    """The result list of embeddings pairs"""
+    """The result list of embeddings pairs (or, when requested, one packed tensor)"""
 
     output: List[EmbeddingsPair]
+    packed: PackedTensor  # Rows are in the same order as inputs
+    inputs: List[int]  # The input token int (or sentence index) for each packed row
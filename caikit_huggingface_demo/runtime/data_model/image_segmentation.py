@@ -24,7 +24,9 @@ from caikit.core.data_model import dataobject
 class Mask(DataObjectBase):
     label: str  # (required) Predicted relevant class name
     score: float  # (required) The confidence-like score of this prediction in [0, 1]
-    mask: str  # (required) Mask for the layer encoded into a str
+    mask: str  # Mask for the layer encoded into a str (mask_format "png")
+    # Row-major run lengths, starting with a run of 0s (mask_format "rle")
+    rle: List[int]
 
 
 @dataobject
@@ -32,3 +34,8 @@ class ImageSegmentationResult(DataObjectBase):
     """The result of image-segmentation inference."""
 
     objects: List[Mask]
+    # mask_format "label_map": one uint8 per pixel, 0 for none or i + 1 for objects[i]
+    label_map: bytes
+    # Size of the rle masks or label_map (smaller than the image when downsampled)
+    width: int
+    height: int
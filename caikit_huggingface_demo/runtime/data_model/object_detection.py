@@ -44,3 +44,10 @@ class ObjectDetectionResult(DataObjectBase):
     """The result of object-detection inference."""
 
     objects: List[ObjectDetected]
+
+
+@dataobject
+class ObjectDetectionBatchResult(DataObjectBase):
+    """The results of object-detection inference for a batch of images (in input order)."""
+
+    results: List[ObjectDetectionResult]
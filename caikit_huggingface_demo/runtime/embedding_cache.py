@@ -0,0 +1,249 @@
+# Copyright The Caikit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+# Standard
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+import fcntl
+import hashlib
+import os
+import threading
+import unicodedata
+
+# Third Party
+from prometheus_client import Counter
+import numpy
+
+# First Party
+import alog
+
+log = alog.use_channel("EMB-CACHE")
+
+CACHE_LOOKUPS = Counter(
+    "sentence_embedding_cache_lookups",
+    "Sentence embedding cache lookups by result (memory hit, disk hit or miss)",
+    ["model", "result"],
+)
+
+
+def normalize_sentence(sentence: str) -> str:
+    """Normalize unicode and whitespace so trivially different inputs share a key"""
+    return " ".join(unicodedata.normalize("NFC", sentence).split())
+
+
+class DiskTier:
+    """Append-only, memory-mapped float32 vector file with a key index file.
+    Survives restarts and can be shared by processes (e.g. --workers): appends
+    hold an exclusive lock on a lock file and pick up the keys other processes
+    added first. A vector row only counts once its key is written, so rows left
+    without a key (e.g. by a crash) are truncated. Stops adding vectors when
+    max_rows is reached."""
+
+    def __init__(self, directory: str, dim: int, max_rows: int) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self.dim = dim
+        self.row_bytes = dim * 4
+        self.max_rows = max_rows
+        self.vectors_path = os.path.join(directory, f"vectors-{dim}.f32")
+        self.keys_path = os.path.join(directory, f"keys-{dim}.txt")
+        self.lock_path = os.path.join(directory, f"lock-{dim}")
+        self.index: Dict[str, int] = {}
+        self.rows = 0  # Key lines read. Row i of the vectors file is line i's.
+        self.keys_offset = 0  # Bytes of the keys file read into the index
+        self.vectors = None
+        with self._locked():
+            self._refresh()
+            self._truncate()
+        self._remap()
+
+    def get(self, key: str) -> Optional[numpy.ndarray]:
+        row = self.index.get(key)
+        return None if row is None else numpy.array(self.vectors[row])
+
+    def put(self, keys: List[str], vectors: numpy.ndarray) -> None:
+        with self._locked():
+            self._refresh()  # Keys added by other processes
+            new = [(k, v) for k, v in zip(keys, vectors) if k not in self.index]
+            new = new[: max(0, self.max_rows - self.rows)]
+            if new:
+                self._truncate()  # Rows without a key, from a crashed writer
+                with open(self.vectors_path, "ab") as vectors_file:
+                    vectors_file.write(
+                        numpy.asarray([v for _, v in new], dtype="<f4").tobytes()
+                    )
+                data = "".join(f"{k}\n" for k, _ in new).encode("utf-8")
+                with open(self.keys_path, "ab") as keys_file:
+                    keys_file.write(data)
+                self.keys_offset += len(data)
+                for k, _ in new:
+                    self.index[k] = self.rows
+                    self.rows += 1
+        self._remap()
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with open(self.lock_path, "a", encoding="utf-8") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _refresh(self) -> None:
+        """Index the complete key lines appended since the last read. Callers hold
+        the lock."""
+        if not os.path.exists(self.keys_path):
+            return
+        with open(self.keys_path, "rb") as keys_file:
+            keys_file.seek(self.keys_offset)
+            data = keys_file.read()
+        complete = data[: data.rfind(b"\n") + 1]  # A partial line is a crashed write
+        for key in complete.decode("utf-8").split():
+            self.index.setdefault(key, self.rows)
+            self.rows += 1
+        self.keys_offset += len(complete)
+
+    def _truncate(self) -> None:
+        """Drop vector rows without a key and partial key lines. Callers hold the
+        lock."""
+        rows_bytes = self.rows * self.row_bytes
+        if os.path.exists(self.vectors_path):
+            if os.path.getsize(self.vectors_path) > rows_bytes:
+                os.truncate(self.vectors_path, rows_bytes)
+            elif os.path.getsize(self.vectors_path) < rows_bytes:
+                raise OSError(f"{self.vectors_path} has fewer rows than its keys")
+        if os.path.exists(self.keys_path):
+            if os.path.getsize(self.keys_path) > self.keys_offset:
+                os.truncate(self.keys_path, self.keys_offset)
+
+    def _remap(self) -> None:
+        self.vectors = (
+            numpy.memmap(
+                self.vectors_path, dtype="<f4", mode="r", shape=(self.rows, self.dim)
+            )
+            if self.rows
+            else None
+        )
+
+
+class EmbeddingCache:
+    """Two-tier (in-memory LRU with a byte budget, optional on-disk memmap) cache
+    of sentence embeddings keyed by model id and normalized sentence hash."""
+
+    def __init__(
+        self,
+        model_id: str,
+        max_bytes: int,
+        disk_dir: Optional[str] = None,
+        disk_max_rows: int = 1000000,
+        dim: Optional[int] = None,
+    ) -> None:
+        self.model_id = model_id
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_rows = disk_max_rows
+        self.disk: Optional[DiskTier] = None
+        self.memory: "OrderedDict[str, numpy.ndarray]" = OrderedDict()
+        self.memory_bytes = 0
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        self._lock = threading.Lock()
+        if dim:
+            self._open_disk(dim)  # Pick up vectors saved by earlier runs
+
+    def key(self, sentence: str) -> str:
+        text = f"{self.model_id}\0{normalize_sentence(sentence)}"
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_or_encode(
+        self,
+        sentences: List[str],
+        encode: Callable[[List[str]], numpy.ndarray],
+    ) -> numpy.ndarray:
+        """Return embeddings for sentences (in order), encoding only the cache misses
+        as one batch"""
+        keys = [self.key(s) for s in sentences]
+        found: Dict[str, numpy.ndarray] = {}
+        missing: Dict[str, str] = {}  # Each distinct miss is encoded once
+        with self._lock:
+            for k, s in zip(keys, sentences):
+                if k not in found and k not in missing:
+                    vector = self._lookup(k)
+                    if vector is not None:
+                        found[k] = vector
+                    else:
+                        missing[k] = s
+            self._count("misses", len(missing))
+
+        if missing:
+            encoded = numpy.asarray(encode(list(missing.values())), dtype=numpy.float32)
+            with self._lock:
+                for k, vector in zip(missing, encoded):
+                    found[k] = vector
+                    self._remember(k, vector)
+                self._disk_put(list(missing), encoded)
+
+        return numpy.stack([found[k] for k in keys])
+
+    def _lookup(self, k: str) -> Optional[numpy.ndarray]:
+        vector = self.memory.get(k)
+        if vector is not None:
+            self.memory.move_to_end(k)
+            self._count("memory_hits")
+            return vector
+        if self.disk is not None:
+            vector = self.disk.get(k)
+            if vector is not None:
+                self._count("disk_hits")
+                self._remember(k, vector)
+                return vector
+        return None
+
+    def _remember(self, k: str, vector: numpy.ndarray) -> None:
+        if vector.nbytes > self.max_bytes or k in self.memory:
+            return
+        self.memory[k] = vector
+        self.memory_bytes += vector.nbytes
+        while self.memory_bytes > self.max_bytes:
+            _, evicted = self.memory.popitem(last=False)
+            self.memory_bytes -= evicted.nbytes
+
+    def _open_disk(self, dim: int) -> None:
+        if not self.disk_dir:
+            return
+        try:
+            self.disk = DiskTier(self.disk_dir, dim, self.disk_max_rows)
+        except OSError as e:
+            self._disable_disk(e)
+
+    def _disk_put(self, keys: List[str], vectors: numpy.ndarray) -> None:
+        if self.disk is None:
+            self._open_disk(vectors.shape[1])
+        if self.disk is None:
+            return
+        try:
+            self.disk.put(keys, vectors)
+        except OSError as e:
+            self._disable_disk(e)
+
+    def _disable_disk(self, e: OSError) -> None:
+        # The disk tier is best effort. Keep serving from memory.
+        log.warning("<EMB81622133W>", "Disabling disk cache tier: %s", e)
+        self.disk_dir = None
+        self.disk = None
+
+    def _count(self, result: str, n: int = 1) -> None:
+        if n:
+            self.stats[result] += n
+            CACHE_LOOKUPS.labels(model=self.model_id, result=result).inc(n)
@@ -12,9 +12,15 @@
 # See the License for the specific language governing permissions and
 # limitations under the License
 
+# Standard
+from typing import Optional
+
 # Third Party
 from module_ids import EMBEDDINGS
+from runtime import stage_metrics
 from runtime.data_model.embeddings import EmbeddingsPair, Result
+from runtime.hf_base import HFBase
+from runtime.weight_registry import WEIGHTS
 from transformers import AutoModel, AutoTokenizer
 import torch
 
@@ -30,44 +36,134 @@ class EmbeddingsTask(TaskBase):
     pass
 
 
+DEFAULT_MODEL = "distilbert-base-uncased"
+DEFAULT_MODEL_REVISION = "1c4513b2eedbda136f57676a34eea67aba266e5c"
+POOLING_MODES = ("none", "mean", "cls", "max")
+
+
 @module(EMBEDDINGS, "embeddings", "0.0.0", EmbeddingsTask)
 class Embeddings(ModuleBase):
-    def __init__(self, tokenizer=None, model=None) -> None:
+    def __init__(
+        self,
+        tokenizer=None,
+        model=None,
+        output_format="",
+        pooling="none",
+        normalize=False,
+        dimensions=0,
+    ) -> None:
         super().__init__()
         self.tokenizer = tokenizer
         self.model = model
+        self.output_format = output_format
+        self.pooling = self._check_pooling(pooling)
+        self.normalize = normalize
+        self.dimensions = dimensions
+
+    def run(
+        self,
+        text_in: str,
+        output_format: str = "",
+        pooling: str = "",
+        normalize: Optional[bool] = None,
+        dimensions: int = 0,
+    ) -> Result:  # pylint: disable=arguments-differ
+        """Run embeddings for each token (or one pooled sentence vector).
+        Args:
+            text_in str
+            output_format str: "" for lists of floats, or float32, float16 or int8
+                to return one PackedTensor instead (defaults to the model config)
+            pooling str: none (one vector per token), mean, cls or max
+                (defaults to the model config)
+            normalize bool: L2 normalize each vector (defaults to the model config)
+            dimensions int: keep only the first N dimensions (0 keeps all)
+        """
+        output_format = output_format or self.output_format
+        pooling = self._check_pooling(pooling or self.pooling)
+        normalize = self.normalize if normalize is None else normalize
+        dimensions = dimensions or self.dimensions
+
+        with stage_metrics.stage("preprocess"):
+            model_input = self.tokenizer(text_in, return_tensors="pt")
+        stage_metrics.observe_input(model_input.input_ids.shape[-1], "tokens")
+        with torch.inference_mode(), stage_metrics.stage("forward"):
+            hidden = self.model(**model_input).last_hidden_state[0]
+            if pooling == "none":
+                inputs = model_input.input_ids[0].tolist()
+            else:
+                # One vector for the text, so the only "input" is text index 0
+                hidden = self._pool(hidden, model_input.attention_mask[0], pooling)
+                inputs = [0]
+            if dimensions:
+                hidden = hidden[:, :dimensions]
+            if normalize:
+                hidden = torch.nn.functional.normalize(hidden, p=2, dim=-1)
+            embeddings = hidden.float().cpu().numpy()  # bf16 has no numpy dtype
+        stage_metrics.observe_output(len(embeddings), "vectors")
 
-    def run(self, text_in: str) -> Result:  # pylint: disable=arguments-differ
-        model_input = self.tokenizer(text_in, return_tensors="pt")
-        model_output = self.model(**model_input)
-        x = torch.squeeze(model_output.last_hidden_state)
-        with torch.no_grad():
-            input_ids = torch.squeeze(model_input.input_ids).detach().cpu().numpy()
-
-            embeddings_pairs = []
-            for i, out in enumerate(x.detach().cpu().numpy()):
-                outputs = [o.item() for o in out]
-                embeddings_pairs.append(
-                    EmbeddingsPair(input=input_ids[i], output=outputs)
+        with stage_metrics.stage("format"):
+            if output_format:
+                return Result(
+                    packed=HFBase.pack_array(embeddings, output_format), inputs=inputs
                 )
 
-        return Result(embeddings_pairs)
+            embeddings_pairs = [
+                EmbeddingsPair(input=inputs[i], output=out)
+                for i, out in enumerate(embeddings.tolist())
+            ]
+            return Result(embeddings_pairs)
+
+    @staticmethod
+    def _pool(hidden, attention_mask, pooling: str):
+        """Pool [tokens x hidden] into [1 x hidden]"""
+        if pooling == "cls":
+            return hidden[:1]
+        mask = attention_mask.unsqueeze(-1).to(hidden.dtype)
+        if pooling == "max":
+            return hidden.masked_fill(mask == 0, float("-inf")).max(dim=0).values[None]
+        return (hidden * mask).sum(dim=0, keepdim=True) / mask.sum().clamp(min=1)
+
+    @staticmethod
+    def _check_pooling(pooling: str) -> str:
+        if pooling not in POOLING_MODES:
+            raise ValueError(
+                f"Unsupported pooling '{pooling}'. Expected one of {POOLING_MODES}"
+            )
+        return pooling
 
     @classmethod
     def load(cls, model_path: str):
         # Read config file
         config = ModuleConfig.load(model_path)
-        model_name = config.hf_model or "distilbert-base-uncased"
-        model_revision = (
-            config.hf_model_revision or "1c4513b2eedbda136f57676a34eea67aba266e5c"
+        model_name = config.hf_model or DEFAULT_MODEL
+        model_revision = config.hf_model_revision or (
+            DEFAULT_MODEL_REVISION if model_name == DEFAULT_MODEL else None
         )
 
-        tokenizer = AutoTokenizer.from_pretrained(model_name, revision=model_revision)
-        model = AutoModel.from_pretrained(model_name)
-        return cls(tokenizer, model)
+        if HFBase.read_backend(model_path) == "onnxruntime":
+            model = HFBase.shared_onnx_model(AutoModel, model_name, model_revision)
+            tokenizer = WEIGHTS.pretrained(AutoTokenizer, model.path)
+        else:
+            tokenizer = WEIGHTS.pretrained(
+                AutoTokenizer, model_name, revision=model_revision
+            )
+            model = WEIGHTS.pretrained(
+                AutoModel,
+                model_name,
+                revision=model_revision,
+                precision=HFBase.read_precision(model_path),
+            )
+        return cls(
+            tokenizer,
+            model,
+            output_format=config.get("output_format", ""),
+            pooling=config.get("pooling", "none"),
+            normalize=config.get("normalize", False),
+            dimensions=config.get("dimensions", 0),
+        )
 
     @classmethod
     def bootstrap(cls, pretrained_model_name_or_path: str):
-        tokenizer = AutoTokenizer.from_pretrained(pretrained_model_name_or_path)
-        model = AutoModel.from_pretrained(pretrained_model_name_or_path)
+        tokenizer = WEIGHTS.pretrained(AutoTokenizer, pretrained_model_name_or_path)
+        model = WEIGHTS.pretrained(AutoModel, pretrained_model_name_or_path)
         return cls(tokenizer, model)
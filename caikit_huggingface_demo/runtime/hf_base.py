@@ -14,23 +14,43 @@
 
 # Standard
 from base64 import b64decode, b64encode
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
+from typing import List
+import functools
 import os
+import threading
+import time
 
 # Third Party
 from PIL import Image
-from transformers import AutoModel, AutoTokenizer
-import requests
+from runtime import compilation, onnx_backend
+from runtime import precision as precisions
+from runtime import stage_metrics
+from runtime.data_model.embeddings import PackedTensor
+from runtime.url_fetcher import UrlFetcher
+from runtime.weight_registry import WEIGHTS, read_only
+from transformers import AutoImageProcessor, AutoModel, AutoTokenizer, pipeline
+from transformers.pipelines import check_task, get_default_model_and_revision
+import numpy
 
 # Local
+from caikit.config import get_config
 from caikit.core import ModuleBase, ModuleConfig
 from caikit.core.modules import ModuleSaver
+from caikit.runtime.model_management.batcher import Batcher
 
 DEFAULT_MODEL = None
 DEFAULT_MODEL_REVISION = None
 
+# Packed tensor formats (little-endian) for PackedTensor.dtype
+PACKED_DTYPES = {"float32": "<f4", "float16": "<f2", "int8": "i1"}
+
 
 class HFBase:
+    _url_fetcher = None
+    _url_fetcher_lock = threading.Lock()
+
     def __init__(self, model=None, tokenizer=None) -> None:
         """This function gets called by `.load` and `.train` function
         which initializes this module.
@@ -38,6 +58,7 @@ class HFBase:
         super().__init__()
         self.model = model
         self.tokenizer = tokenizer
+        self.batcher = None
 
     @classmethod
     def read_config(cls, model_name_or_path, default_model, default_model_revision):
@@ -46,32 +67,253 @@ class HFBase:
         model_revision = config.get("hf_model_revision", default_model_revision)
         return model_name, model_revision
 
+    @classmethod
+    def read_precision(cls, model_name_or_path) -> str:
+        """The model config precision: fp32 (default), bf16 or int8-dynamic"""
+        config = ModuleConfig.load(model_name_or_path)
+        return precisions.check_precision(config.get("precision", "fp32"))
+
+    @classmethod
+    def read_backend(cls, model_name_or_path) -> str:
+        """The model config backend: torch (default) or onnxruntime"""
+        config = ModuleConfig.load(model_name_or_path)
+        return onnx_backend.check_backend(
+            config.get("backend", "torch"), cls.read_precision(model_name_or_path)
+        )
+
+    @classmethod
+    def read_compile_options(cls, model_name_or_path) -> compilation.CompileOptions:
+        """The model config compile and attention settings"""
+        return compilation.CompileOptions.from_config(model_name_or_path)
+
+    @classmethod
+    def warmup_generate(cls, model, tokenizer, compile_options) -> None:
+        """Compile (at load time) with a tiny generate() when compile_options are set"""
+        compilation.warmup(
+            model,
+            compile_options,
+            lambda: model.generate(
+                **tokenizer("Hello", return_tensors="pt"), max_new_tokens=2
+            ),
+        )
+
+    @classmethod
+    def shared_onnx_model(
+        cls, auto_class, name: str, revision=None, processor_class=AutoTokenizer
+    ) -> onnx_backend.OnnxModel:
+        """Return the shared ONNX Runtime model for auto_class, name and revision
+        (exported to the onnx_cache_dir on first use)"""
+        return WEIGHTS.get(
+            ("onnxruntime", auto_class.__name__, name, revision),
+            lambda: onnx_backend.load(auto_class, name, revision, processor_class),
+        )
+
+    def configure_batching(self, model_config_path):
+        """Enable dynamic micro-batching if the model config.yml asks for it.
+
+        Config keys:
+            batch_size: max requests per forward pass (0 or missing disables batching)
+            batch_collect_delay_ms: how long to wait for another request before
+                running a partial batch
+
+        Modules using this must implement run_batch() with list-valued kwargs.
+        """
+        config = ModuleConfig.load(model_config_path)
+        batch_size = config.get("batch_size", 0)
+        if batch_size and batch_size > 1:
+            delay_ms = config.get("batch_collect_delay_ms", 5)
+            self.batcher = Batcher(
+                model_name=os.path.basename(os.path.normpath(model_config_path)),
+                model=self,
+                batch_size=batch_size,
+                batch_collect_delay_s=delay_ms / 1000.0,
+            )
+            self._batch_starts = {}
+            self.run_batch = self._timed_batch(self.run_batch)
+
+    def _timed_batch(self, run_batch):
+        """Wrap run_batch() to record when the batch of each result started"""
+
+        @functools.wraps(run_batch)
+        def timed(**kwargs):
+            started = time.perf_counter()
+            results = run_batch(**kwargs)
+            for result in results:
+                self._batch_starts[id(result)] = started
+            return results
+
+        return timed
+
+    def run_batched(self, **kwargs):
+        """Run one request through run_batch(), sharing a batch with concurrent
+        requests when a batcher is configured. The time spent waiting for the
+        shared batch to start counts as queue wait, the time running it as the
+        batch stage."""
+        if self.batcher:
+            queued = time.perf_counter()
+            result = self.batcher.run(**kwargs)
+            started = self._batch_starts.pop(id(result), queued)
+            stage_metrics.observe_batch_wait(started - queued)
+            stage_metrics.add_stage("batch", time.perf_counter() - started)
+            return result
+        return self.run_batch(**{k: [v] for k, v in kwargs.items()})[0]
+
     @classmethod
     def load(cls, model_config_path: str):
         model_name, model_revision = cls.read_config(
             model_config_path, DEFAULT_MODEL, DEFAULT_MODEL_REVISION
         )
-        return cls.bootstrap(model_name, revision=model_revision)
+        return cls.bootstrap(
+            model_name,
+            revision=model_revision,
+            precision=cls.read_precision(model_config_path),
+        )
 
     @classmethod
-    def bootstrap(cls, pretrained_model_name_or_path: str, revision=None):
-        tokenizer = AutoTokenizer.from_pretrained(
-            pretrained_model_name_or_path, revision=revision
+    def bootstrap(
+        cls, pretrained_model_name_or_path: str, revision=None, precision="fp32"
+    ):
+        tokenizer = WEIGHTS.pretrained(
+            AutoTokenizer, pretrained_model_name_or_path, revision=revision
         )
-        model = AutoModel.from_pretrained(
-            pretrained_model_name_or_path, revision=revision
+        model = WEIGHTS.pretrained(
+            AutoModel,
+            pretrained_model_name_or_path,
+            revision=revision,
+            precision=precision,
         )
         return cls(model, tokenizer)
 
+    @classmethod
+    def shared_pipeline(
+        cls,
+        task: str,
+        model: str = None,
+        revision=None,
+        precision: str = "fp32",
+        backend: str = "torch",
+        compile_options: compilation.CompileOptions = compilation.CompileOptions(),
+        **kwargs,
+    ):
+        """Return a read-only pipeline shared by all modules loading the same
+        task, model, revision, precision, backend and pipeline kwargs (see
+        WeightRegistry). int8-dynamic models are cached on disk when the model name
+        is configured. backend onnxruntime runs an ONNX export of the model.
+        compile_options are applied to the torch model (see runtime.compilation)."""
+        key = (
+            "pipeline",
+            task,
+            model,
+            revision,
+            precision,
+            backend,
+            compile_options,
+            tuple(sorted(kwargs.items())),
+        )
+        if backend == "onnxruntime":
+            return WEIGHTS.get(
+                key,
+                lambda: stage_metrics.instrument_pipeline(
+                    cls._onnx_pipeline(task, model, revision, **kwargs)
+                ),
+            )
+
+        def load():
+            cache_path = None
+            if precision == "int8-dynamic" and model:
+                cache_path = precisions.quantized_cache_path(
+                    f"pipeline-{task}", model, revision
+                )
+                quantized = precisions.load_quantized(cache_path)
+                if quantized is not None:
+                    # pipeline() cannot infer the tokenizer/processor from a model
+                    # object, so load it for the model name
+                    processor_class, processor_kwarg = cls._pipeline_processor(task)
+                    processor = processor_class.from_pretrained(
+                        model, revision=revision
+                    )
+                    pipe = pipeline(
+                        task=task,
+                        model=quantized,
+                        revision=revision,
+                        **{processor_kwarg: processor},
+                        **kwargs,
+                    )
+                    pipe.model = compilation.apply(
+                        read_only(pipe.model), compile_options
+                    )
+                    return stage_metrics.instrument_pipeline(pipe)
+
+            pipe = pipeline(
+                task=task,
+                model=model,
+                revision=revision,
+                **precisions.load_kwargs(precision),
+                **kwargs,
+            )
+            if precision == "bf16":
+                precisions.float32_io(pipe.model)
+            elif precision == "int8-dynamic":
+                pipe.model = precisions.quantize(pipe.model)
+                if cache_path:
+                    precisions.save_quantized(pipe.model, cache_path)
+            pipe.model = compilation.apply(read_only(pipe.model), compile_options)
+            return stage_metrics.instrument_pipeline(pipe)
+
+        return WEIGHTS.get(key, load)
+
+    @staticmethod
+    def _pipeline_processor(task: str):
+        """The processor class for task's input (AutoTokenizer or AutoImageProcessor)
+        and the pipeline() argument that takes it"""
+        _, targeted_task, _ = check_task(task)
+        if targeted_task["type"] == "image":
+            return AutoImageProcessor, "image_processor"
+        return AutoTokenizer, "tokenizer"
+
+    @classmethod
+    def _onnx_pipeline(cls, task: str, model: str, revision, **kwargs):
+        """A pipeline for task running the ONNX export of model (or the task's
+        default model) with the tokenizer or image processor saved with it"""
+        _, targeted_task, _ = check_task(task)
+        if not model:
+            model, revision = get_default_model_and_revision(targeted_task, "pt", None)
+        processor_class, processor_kwarg = cls._pipeline_processor(task)
+        onnx_model = cls.shared_onnx_model(
+            targeted_task["pt"][0], model, revision, processor_class
+        )
+        processor = processor_class.from_pretrained(onnx_model.path)
+        return pipeline(
+            task=task, model=onnx_model, **{processor_kwarg: processor}, **kwargs
+        )
+
+    @classmethod
+    def get_image(
+        cls, encoded_bytes_or_url: str = "", image_bytes: bytes = b""
+    ) -> Image:
+        """Return a PIL Image from raw image_bytes (preferred, no re-encoding) or else
+        from the encoded_bytes_or_url string."""
+        with stage_metrics.stage("decode"):
+            if image_bytes:
+                # BytesIO shares the request buffer (no copy unless written to)
+                image = Image.open(BytesIO(image_bytes))
+            elif encoded_bytes_or_url:
+                image = cls.get_image_bytes(encoded_bytes_or_url)
+            else:
+                raise ValueError(
+                    "Either image_bytes or encoded_bytes_or_url is required"
+                )
+            image.load()  # Decode now (PIL is lazy) so it is timed here
+        stage_metrics.observe_input(image.width * image.height, "pixels")
+        return image
+
     @classmethod
     def get_image_bytes(cls, encoded_bytes_or_url: str) -> Image:
         """Take input string (url, path-to-file, or encoded bytes) and return a PIL Image."""
 
         # Get image from URL
         if encoded_bytes_or_url.startswith("http"):
-            return Image.open(
-                requests.get(encoded_bytes_or_url, stream=True, timeout=60).raw
-            )
+            return Image.open(BytesIO(cls.url_fetcher().fetch(encoded_bytes_or_url)))
 
         # Get image from local file. Handy for local demo/test.
         # Simple length limit check to avoid trying to use image data as a path.
@@ -81,8 +323,74 @@ class HFBase:
         # Decode and open the image bytes
         return Image.open(BytesIO(b64decode(encoded_bytes_or_url)))
 
+    @classmethod
+    def get_images_bytes(cls, encoded_bytes_or_urls: List[str]) -> List[Image]:
+        """Like get_image_bytes for a list of inputs, downloading all URLs concurrently."""
+        urls = [x for x in encoded_bytes_or_urls if x.startswith("http")]
+        fetched = dict(zip(urls, cls.url_fetcher().fetch_many(urls)))
+        return [
+            Image.open(BytesIO(fetched[x])) if x in fetched else cls.get_image_bytes(x)
+            for x in encoded_bytes_or_urls
+        ]
+
+    @classmethod
+    def get_images(
+        cls, encoded_bytes_or_urls: List[str] = None, images_bytes: List[bytes] = None
+    ) -> List[Image]:
+        """Like get_image for a batch of inputs. URLs are downloaded and the images are
+        decoded concurrently (PIL releases the GIL while decoding)."""
+        with stage_metrics.stage("decode"):
+            if images_bytes:
+                images = [Image.open(BytesIO(b)) for b in images_bytes]
+            elif encoded_bytes_or_urls:
+                images = cls.get_images_bytes(encoded_bytes_or_urls)
+            else:
+                raise ValueError(
+                    "Either images_bytes or encoded_bytes_or_urls is required"
+                )
+
+            workers = min(len(images), os.cpu_count() or 1)
+            if workers > 1:
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    list(executor.map(Image.Image.load, images))
+            else:
+                for image in images:
+                    image.load()
+        stage_metrics.observe_input(sum(i.width * i.height for i in images), "pixels")
+        return images
+
+    @classmethod
+    def url_fetcher(cls) -> UrlFetcher:
+        """The process-wide URL fetcher (pooled connections and a content cache)
+        configured by the image_fetch section of the runtime config.yml."""
+        if cls._url_fetcher is None:
+            with cls._url_fetcher_lock:
+                if HFBase._url_fetcher is None:
+                    fetch_config = get_config().get("image_fetch") or {}
+                    HFBase._url_fetcher = UrlFetcher(**fetch_config)
+        return HFBase._url_fetcher
+
     @classmethod
     def encode_image(cls, image: Image) -> bytes:
         image_as_bytes = BytesIO()
         image.save(image_as_bytes, "PNG")  # Save into PNG file-like object
         return b64encode(image_as_bytes.getvalue())  # Encode for transport
+
+    @classmethod
+    def pack_array(cls, array, dtype: str) -> PackedTensor:
+        """Pack a numpy array (or CPU tensor) into one buffer for transport.
+        int8 uses one symmetric scale for the whole tensor."""
+        if dtype not in PACKED_DTYPES:
+            raise ValueError(
+                f"Unsupported packed dtype '{dtype}'. Expected one of {list(PACKED_DTYPES)}"
+            )
+        array = numpy.asarray(array, dtype=numpy.float32)
+        scale = 0.0
+        if dtype == "int8":
+            max_abs = float(numpy.abs(array).max()) if array.size else 0.0
+            scale = max_abs / 127.0 if max_abs else 1.0
+            array = numpy.rint(array / scale)
+        data = numpy.ascontiguousarray(array.astype(PACKED_DTYPES[dtype])).tobytes()
+        return PackedTensor(
+            data=data, dtype=dtype, shape=list(array.shape), scale=scale
+        )
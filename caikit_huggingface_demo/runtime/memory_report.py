@@ -0,0 +1,222 @@
+# Copyright The Caikit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+
+# Standard
+from typing import Dict, Iterator, List, Optional, Tuple
+import resource
+import sys
+import threading
+import tracemalloc
+
+# Third Party
+from runtime.weight_registry import WEIGHTS
+
+# Local
+from caikit.core import ModuleBase
+from caikit.runtime.model_management.model_manager import ModelManager
+
+
+def _attributes(module: ModuleBase, name: str) -> Iterator[object]:
+    """The module's attributes and their `name` attribute (e.g. a pipeline's model)"""
+    for value in vars(module).values():
+        yield value
+        nested = getattr(value, name, None)
+        if nested is not None:
+            yield nested
+
+
+def _unlisted_bytes(submodule) -> int:
+    """Bytes of the weights a torch module holds outside of its parameters and
+    buffers: the packed int8 weights of dynamically quantized Linear layers and
+    the ONNX Runtime session of an OnnxModel"""
+    packed = getattr(submodule, "_packed_params", None)
+    if hasattr(packed, "_weight_bias"):
+        weight_bias = packed._weight_bias()  # pylint: disable=protected-access
+        return sum(t.numel() * t.element_size() for t in weight_bias if t is not None)
+    if hasattr(submodule, "session_bytes"):
+        return submodule.session_bytes()
+    return 0
+
+
+def module_tensors(module: ModuleBase) -> Tuple[Dict[int, int], Dict[int, int]]:
+    """Bytes by tensor id of the torch parameters and of the buffers reachable from
+    a module's attributes (models, pipelines, sentence transformers). Quantized
+    weights and ONNX Runtime sessions count as parameters, by the id of the torch
+    module holding them."""
+    parameters: Dict[int, int] = {}
+    buffers: Dict[int, int] = {}
+    for candidate in _attributes(module, "model"):
+        if not hasattr(candidate, "parameters") or not hasattr(candidate, "buffers"):
+            continue
+        for tensors, found in (
+            (candidate.parameters(), parameters),
+            (candidate.buffers(), buffers),
+        ):
+            for tensor in tensors:
+                found[id(tensor)] = tensor.numel() * tensor.element_size()
+        for submodule in getattr(candidate, "modules", list)():
+            size = _unlisted_bytes(submodule)
+            if size:
+                parameters[id(submodule)] = size
+    return parameters, buffers
+
+
+def tokenizer_bytes(module: ModuleBase) -> int:
+    """Estimated size of the tokenizers reachable from a module's attributes: the
+    serialized size of fast tokenizers, else the size of the vocabulary text"""
+    total = 0
+    seen = set()
+    for candidate in _attributes(module, "tokenizer"):
+        if not hasattr(candidate, "get_vocab") or id(candidate) in seen:
+            continue
+        seen.add(id(candidate))
+        backend = getattr(candidate, "backend_tokenizer", None)
+        if backend is not None:
+            total += len(backend.to_str().encode("utf-8"))
+        else:
+            total += sum(len(token.encode("utf-8")) for token in candidate.get_vocab())
+    return total
+
+
+def process_memory() -> Dict[str, Optional[int]]:
+    """Resident set size and its peak for this process, in bytes"""
+    rss = None
+    try:
+        with open("/proc/self/status", encoding="utf-8") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    rss = int(line.split()[1]) * 1024
+    except OSError:
+        pass  # Not Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != "darwin":
+        peak *= 1024  # KiB except on macOS
+    return {"rss_bytes": rss, "peak_rss_bytes": peak}
+
+
+class AllocationTracker:
+    """On-demand tracemalloc tracing. top() lists the Python allocation sites that
+    grew the most since start(), e.g. while sending inference requests.
+
+    Tracing slows down every allocation, so it is off until started. Memory
+    allocated by torch for tensors is not seen by tracemalloc (numpy's is).
+    """
+
+    def __init__(self) -> None:
+        self.baseline: Optional[tracemalloc.Snapshot] = None
+        self._lock = threading.Lock()
+
+    def start(self, frames: int = 1) -> dict:
+        if not 1 <= frames <= 100:
+            raise ValueError("frames must be in [1, 100]")
+        with self._lock:
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+            tracemalloc.start(frames)
+            self.baseline = tracemalloc.take_snapshot()
+        return self.status()
+
+    def stop(self) -> dict:
+        with self._lock:
+            tracemalloc.stop()
+            self.baseline = None
+        return self.status()
+
+    def status(self) -> dict:
+        tracing = tracemalloc.is_tracing()
+        traced, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+        return {"tracing": tracing, "traced_bytes": traced, "traced_peak_bytes": peak}
+
+    def top(self, limit: int) -> List[dict]:
+        """The limit allocation sites with the largest growth since start()"""
+        with self._lock:
+            if self.baseline is None or not tracemalloc.is_tracing():
+                return []
+            snapshot = tracemalloc.take_snapshot().filter_traces(
+                [tracemalloc.Filter(False, tracemalloc.__file__)]
+            )
+            stats = snapshot.compare_to(self.baseline, "traceback")
+        return [
+            {
+                "site": [str(frame) for frame in stat.traceback],
+                "size_bytes": stat.size,
+                "size_diff_bytes": stat.size_diff,
+                "count": stat.count,
+                "count_diff": stat.count_diff,
+            }
+            for stat in stats[:limit]
+        ]
+
+
+ALLOCATIONS = AllocationTracker()
+
+
+def memory_report(model_manager: Optional[ModelManager] = None, top: int = 10) -> dict:
+    """Memory used by each loaded model and by the process, largest models first.
+
+    Tensors shared by several models (see WeightRegistry) are counted for each of
+    them and also reported as their shared_bytes. The totals count them once.
+
+    Without model_manager, the models of the ModelManager instance are reported
+    (none before it is created, e.g. while the admin server starts first).
+    """
+    if model_manager is None:
+        # Not get_instance(), which would create a plain ModelManager
+        # pylint: disable-next=protected-access
+        model_manager = ModelManager._ModelManager__instance
+    loaded = {
+        model_id: loaded_model.module()
+        for model_id, loaded_model in list(
+            getattr(model_manager, "loaded_models", {}).items()
+        )
+    }
+    tensors = {model_id: module_tensors(module) for model_id, module in loaded.items()}
+    users: Dict[int, int] = {}  # Number of models using each tensor
+    for parameters, buffers in tensors.values():
+        for tensor_id in {**parameters, **buffers}:
+            users[tensor_id] = users.get(tensor_id, 0) + 1
+
+    models = []
+    for model_id, module in loaded.items():
+        parameters, buffers = tensors[model_id]
+        models.append(
+            {
+                "model_id": model_id,
+                "module_id": module.metadata["module_id"],
+                "parameter_bytes": sum(parameters.values()),
+                "buffer_bytes": sum(buffers.values()),
+                "tokenizer_bytes": tokenizer_bytes(module),
+                "shared_bytes": sum(
+                    size
+                    for tensor_id, size in {**parameters, **buffers}.items()
+                    if users[tensor_id] > 1
+                ),
+            }
+        )
+    models.sort(key=lambda m: m["parameter_bytes"] + m["buffer_bytes"], reverse=True)
+
+    unique_tensors = {}
+    for parameters, buffers in tensors.values():
+        unique_tensors.update(parameters)
+        unique_tensors.update(buffers)
+    model_paths = getattr(model_manager, "model_paths", {})
+    return {
+        "process": process_memory(),
+        "models": models,
+        "not_loaded": sorted(set(model_paths) - set(loaded)),
+        "total_tensor_bytes": sum(unique_tensors.values()),
+        "shared_weights": [str(key) for key in WEIGHTS.keys()],
+        "tracemalloc": {**ALLOCATIONS.status(), "top": ALLOCATIONS.top(top)},
+    }
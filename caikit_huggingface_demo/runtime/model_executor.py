@@ -0,0 +1,135 @@
+# Copyright The Caikit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+# Standard
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Dict, Iterable
+import functools
+import queue
+
+# Third Party
+import torch
+
+# First Party
+import alog
+
+# Local
+from caikit.core import ModuleBase
+
+log = alog.use_channel("MODEL-EXEC")
+
+_DONE = object()
+
+
+class _Raised:
+    def __init__(self, error: BaseException) -> None:
+        self.error = error
+
+
+class ModelExecutor:
+    """Runs one model's inference calls on its own pool of worker threads instead
+    of the gRPC threads, so concurrent requests cannot oversubscribe the cores.
+
+    torch's intra-op thread count is a process-wide setting (it also configures
+    MKL and is picked up by every thread started afterwards), so intra_op_threads
+    sets it for the whole process. Only use it when the process serves this one
+    model (see LocalModelManager.load_model). The cores the model can use are then
+    about workers x intra_op_threads.
+    """
+
+    def __init__(self, model_id: str, workers: int, intra_op_threads: int = 0) -> None:
+        self.model_id = model_id
+        self.workers = workers
+        self.intra_op_threads = intra_op_threads
+        if intra_op_threads:
+            torch.set_num_threads(intra_op_threads)
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix=f"model-{model_id}"
+        )
+
+    def install(self, module: ModuleBase) -> None:
+        """Dispatch the module's inference methods (run, streaming variants) to this
+        executor. The instance attributes shadow the class methods, so the module
+        type and its inference signatures are unchanged."""
+        for method_name, output_streaming in self.inference_methods(module).items():
+            method = getattr(module, method_name)
+            wrapped = self._stream(method) if output_streaming else self._call(method)
+            setattr(module, method_name, wrapped)
+        log.info(
+            "<EXE31307711I>",
+            "Model '%s' runs on %d executor threads with %s intra-op threads each",
+            self.model_id,
+            self.workers,
+            self.intra_op_threads or "default",
+        )
+
+    @staticmethod
+    def inference_methods(module: ModuleBase) -> Dict[str, bool]:
+        """Map the module's inference method names to whether they stream output"""
+        methods = {}
+        for input_streaming in (False, True):
+            for output_streaming in (False, True):
+                signature = type(module).get_inference_signature(
+                    input_streaming, output_streaming
+                )
+                if signature:
+                    methods[signature.method_name] = output_streaming
+        return methods
+
+    @staticmethod
+    def _queued(method):
+        """Call method in a copy of the caller's context, so the request's arrival
+        (see stage_metrics.mark_arrival) follows it to the executor thread"""
+        context = copy_context()
+
+        def run(*args, **kwargs):
+            return context.run(method, *args, **kwargs)
+
+        return run
+
+    def _call(self, method):
+        @functools.wraps(method)
+        def call(*args, **kwargs):
+            return self.executor.submit(self._queued(method), *args, **kwargs).result()
+
+        return call
+
+    def _stream(self, method):
+        @functools.wraps(method)
+        def stream(*args, **kwargs) -> Iterable:
+            items = queue.Queue()
+
+            def produce():
+                try:
+                    for item in method(*args, **kwargs):
+                        items.put(item)
+                except BaseException as e:  # pylint: disable=broad-exception-caught
+                    items.put(_Raised(e))  # Re-raised on the gRPC thread
+                finally:
+                    items.put(_DONE)
+
+            self.executor.submit(self._queued(produce))
+            while True:
+                item = items.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, _Raised):
+                    raise item.error
+                yield item
+
+        return stream
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,364 @@
+# Copyright The Caikit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+# Standard
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Collection, Dict, List, Optional, Tuple
+import os
+import threading
+import time
+
+# Third Party
+from grpc import StatusCode
+from prometheus_client import Gauge
+from runtime import stage_metrics
+from runtime.memory_report import module_tensors
+from runtime.model_executor import ModelExecutor
+from runtime.profiling import PROFILER
+
+# First Party
+import alog
+
+# Local
+from caikit.config import get_config
+from caikit.core import ModuleBase, ModuleConfig
+from caikit.runtime.model_management.model_manager import ModelManager
+from caikit.runtime.types.caikit_runtime_exception import CaikitRuntimeException
+
+log = alog.use_channel("MODEL-MGR")
+
+MODEL_TYPE = "standalone-model"  # What caikit uses for models in local_models_dir
+
+MODELS_READY = Gauge(
+    "local_models_ready", "1 once the required local models are loaded, else 0"
+)
+
+
+def module_memory_bytes(module: ModuleBase) -> int:
+    """Bytes of the torch parameters and buffers (including quantized weights and
+    ONNX Runtime sessions) reachable from a module's attributes (models, pipelines,
+    sentence transformers). Each tensor is counted once."""
+    parameters, buffers = module_tensors(module)
+    return sum({**parameters, **buffers}.values())
+
+
+class _UnlockedLoader:
+    """caikit's ModelLoader, running its loads without holding the manager's models
+    lock. LocalModelManager holds that lock around ModelManager.load_model, whose
+    bookkeeping (loaded_models and the model size metrics) is not thread-safe, so
+    only the loads themselves run in parallel."""
+
+    def __init__(self, loader, models_lock: threading.Lock) -> None:
+        self.loader = loader
+        self.models_lock = models_lock
+
+    def load_model(self, *args, **kwargs):
+        self.models_lock.release()
+        try:
+            return self.loader.load_model(*args, **kwargs)
+        finally:
+            self.models_lock.acquire()
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+
+class LocalModelManager(ModelManager):
+    """ModelManager for the models in local_models_dir, configured by the
+    model_loading section of the runtime config.yml.
+
+    Startup loads run on a pool of load_workers threads (loading is mostly I/O and
+    deserialization, which release the GIL). The ready event (and the
+    local_models_ready metric) is set once the required_models are loaded, or once
+    every startup load is done when no required_models are listed. With
+    background: true the server starts while models load, and requests for a
+    model that is still loading wait for it.
+
+    With lazy: true, models are only registered at startup (except required_models)
+    and loaded by the first request for them. Concurrent first requests share one
+    load. When memory_budget_bytes is set, the least recently used models that have
+    been idle for at least min_idle_s are unloaded to stay within the budget.
+
+    With model_ids, only those models in local_models_dir are managed (e.g. by a
+    process dedicated to one model).
+
+    Create this before the gRPC server so that ModelManager.get_instance() returns it.
+    """
+
+    def __init__(self, model_ids: Optional[Collection[str]] = None) -> None:
+        loading_config = get_config().get("model_loading") or {}
+        self.lazy = loading_config.get("lazy", False)
+        self.memory_budget_bytes = loading_config.get("memory_budget_bytes", 0)
+        self.min_idle_s = loading_config.get("min_idle_s", 30)
+        self.ready_timeout_s = loading_config.get("ready_timeout_s", 3600)
+        self.load_workers = loading_config.get("load_workers", 4)
+        self.background = loading_config.get("background", False)
+        self.model_ids = None if model_ids is None else set(model_ids)
+        self.required_models = [
+            m
+            for m in loading_config.get("required_models") or []
+            if self.model_ids is None or m in self.model_ids
+        ]
+
+        self.model_paths: Dict[str, str] = {}  # Every model available to load
+        self.model_bytes: Dict[str, int] = {}
+        self.last_used: "OrderedDict[str, float]" = OrderedDict()  # LRU order
+        self.ready = threading.Event()
+        self.startup_done = threading.Event()  # Set whether or not it got ready
+        MODELS_READY.set(0)
+        self._lock = threading.Lock()
+        self._models_lock = threading.Lock()  # Guards caikit's loaded_models updates
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._startup_loads: Dict[str, Future] = {}
+        self.executors: Dict[str, ModelExecutor] = {}
+        super().__init__()  # Calls load_local_models() unless the directory is empty
+        if not self.model_paths:
+            log.error(
+                "<MGR51630880E>",
+                "Not ready. No models in directory: %s",
+                get_config().runtime.local_models_dir,
+            )
+            self.startup_done.set()
+
+    def wait_ready(self) -> None:
+        """Wait (at most model_loading.ready_timeout_s) for the startup loads and
+        raise if the models did not get ready"""
+        if not self.startup_done.wait(self.ready_timeout_s or None):
+            raise CaikitRuntimeException(
+                StatusCode.DEADLINE_EXCEEDED,
+                f"Models not ready after {self.ready_timeout_s}s",
+            )
+        if not self.ready.is_set():
+            raise CaikitRuntimeException(
+                StatusCode.INTERNAL, "Models did not get ready (see the log)"
+            )
+
+    def load_local_models(self, local_model_dir):
+        """Load the models in local_model_dir on a thread pool (or with lazy, register
+        them and only load the required_models)"""
+        # caikit calls this (if the directory has models) before any load_model()
+        self.model_loader = _UnlockedLoader(self.model_loader, self._models_lock)
+        started = time.monotonic()
+        for model_id in os.listdir(local_model_dir):
+            if self.model_ids is not None and model_id not in self.model_ids:
+                continue
+            # Use the file name as the model id
+            self.model_paths[model_id] = os.path.join(local_model_dir, model_id)
+
+        startup_models = self.required_models if self.lazy else self.model_paths
+        executor = ThreadPoolExecutor(
+            max_workers=max(1, self.load_workers), thread_name_prefix="model-load"
+        )
+        for model_id in startup_models:
+            if model_id in self.model_paths:
+                self._startup_loads[model_id] = executor.submit(
+                    self._startup_load, model_id
+                )
+        executor.shutdown(wait=False)
+
+        if self.background:
+            threading.Thread(
+                target=self._wait_ready, args=(started,), daemon=True
+            ).start()
+            return
+        self._wait_ready(started)
+        if not self.lazy and not self.loaded_models:
+            log.error(
+                "<MGR51630875E>", "No models loaded in directory: %s", local_model_dir
+            )
+            raise CaikitRuntimeException(
+                StatusCode.INTERNAL, "No standalone models loaded"
+            )
+
+    def load_model(self, model_id, local_model_path, model_type) -> int:
+        """Load a model, measure its inference calls (see runtime.stage_metrics),
+        make them profilable on demand (see runtime.profiling) and, if its config
+        sets executor_workers, dispatch them to a ModelExecutor. intra_op_threads
+        is only applied when this process serves just this model, because torch's
+        thread count is process-wide."""
+        with self._models_lock:
+            already_loaded = model_id in self.loaded_models
+            model_size = super().load_model(model_id, local_model_path, model_type)
+            module = self.loaded_models[model_id].module()
+            if not already_loaded:
+                methods = ModelExecutor.inference_methods(module)
+                stage_metrics.install(module, model_id, methods)
+                PROFILER.install(module, model_id, methods)
+        config = ModuleConfig.load(local_model_path)
+        workers = config.get("executor_workers", 0)
+        if workers and model_id not in self.executors:
+            intra_op_threads = config.get("intra_op_threads", 0)
+            if intra_op_threads and self.model_ids != {model_id}:
+                log.warning(
+                    "<MGR51630879W>",
+                    "Ignoring intra_op_threads of model '%s'. It would change the "
+                    "torch thread count of every model in the process. Set "
+                    "isolated_process: true to give the model its own process.",
+                    model_id,
+                )
+                intra_op_threads = 0
+            executor = ModelExecutor(model_id, workers, intra_op_threads)
+            executor.install(module)
+            self.executors[model_id] = executor
+        return model_size
+
+    def unload_model(self, model_id) -> int:
+        executor = self.executors.pop(model_id, None)
+        if executor:
+            executor.shutdown()  # Queued and running calls still finish
+        with self._models_lock:
+            return super().unload_model(model_id)
+
+    def retrieve_model(self, model_id) -> ModuleBase:
+        """Retrieve a loaded model (waiting for its startup load, or loading it
+        first in lazy mode). caikit calls this first for each RPC, so the queue wait
+        of the request starts here (see stage_metrics.for_request)."""
+        arrival = stage_metrics.arrive(model_id)
+        startup_load = self._startup_loads.get(model_id)
+        if startup_load is not None and not startup_load.done():
+            startup_load.result()
+        if self.lazy and model_id in self.model_paths:
+            module = self._load_on_demand(model_id)
+        else:
+            module = super().retrieve_model(model_id)
+        methods = ModelExecutor.inference_methods(module)
+        return stage_metrics.for_request(module, arrival, methods)
+
+    def _startup_load(self, model_id: str) -> bool:
+        try:
+            if self.lazy:
+                self._load_on_demand(model_id)
+            else:
+                self._load_timed(model_id)
+            return True
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            log.warning(
+                "<MGR51630876W>",
+                "Failed to load model %s: %s",
+                model_id,
+                repr(e),
+                exc_info=True,
+            )
+            return False
+
+    def _wait_ready(self, started: float) -> None:
+        """Set ready once the required models (default: all startup loads) are done,
+        then startup_done (also when they failed)"""
+        try:
+            self._check_ready(started)
+        finally:
+            self.startup_done.set()
+
+    def _check_ready(self, started: float) -> None:
+        loaded = {
+            m
+            for m, f in self._startup_loads.items()
+            if f.exception() is None and f.result()
+        }
+        missing = [m for m in self.required_models if m not in loaded]
+        if missing or not (loaded or self.lazy):
+            log.error(
+                "<MGR51630877E>",
+                "Not ready. Required models did not load: %s",
+                missing or "all",
+            )
+            return
+        log.info(
+            "<MGR51630878I>",
+            "Ready after %.2fs with %d models loaded",
+            time.monotonic() - started,
+            len(loaded),
+        )
+        MODELS_READY.set(1)
+        self.ready.set()
+
+    def _load_timed(self, model_id: str) -> None:
+        start = time.monotonic()
+        self.load_model(model_id, self.model_paths[model_id], MODEL_TYPE)
+        model_bytes = module_memory_bytes(self.loaded_models[model_id].module())
+        with self._lock:
+            self.model_bytes[model_id] = model_bytes
+        log.info(
+            "<MGR51630872I>",
+            "Loaded model '%s' in %.2fs (%d bytes)",
+            model_id,
+            time.monotonic() - start,
+            model_bytes,
+        )
+
+    def _load_lock(self, model_id: str) -> threading.Lock:
+        with self._lock:
+            return self._load_locks.setdefault(model_id, threading.Lock())
+
+    def _load_on_demand(self, model_id: str) -> ModuleBase:
+        """Retrieve a model, loading it first if needed, and mark it used. This holds
+        the model's load lock, so it cannot be unloaded in between."""
+        evicted = []
+        with self._load_lock(model_id):  # Concurrent first requests wait for one load
+            loaded = model_id not in self.loaded_models
+            if loaded:
+                self._load_timed(model_id)
+            module = super().retrieve_model(model_id)
+            with self._lock:
+                self._touch(model_id)
+                if loaded:
+                    evicted = self._choose_evictions(keep=model_id)
+        # Unload without holding self._lock, so other models' loads do not wait
+        for evicted_id, evicted_bytes in evicted:
+            self._unload_evicted(evicted_id, evicted_bytes)
+        return module
+
+    def _touch(self, model_id: str) -> None:
+        self.last_used[model_id] = time.monotonic()
+        self.last_used.move_to_end(model_id)
+
+    def _choose_evictions(self, keep: str) -> List[Tuple[str, int]]:
+        """Idle models (and their bytes) to unload, least recently used first, to get
+        within budget. They are no longer counted or tracked as used. Callers hold
+        self._lock."""
+        evicted = []
+        if not self.memory_budget_bytes:
+            return evicted
+        total = sum(self.model_bytes.get(m, 0) for m in self.loaded_models)
+        now = time.monotonic()
+        for model_id, last_used in list(self.last_used.items()):
+            if total <= self.memory_budget_bytes:
+                break
+            if model_id == keep or now - last_used < self.min_idle_s:
+                continue
+            model_bytes = self.model_bytes.pop(model_id, 0)
+            total -= model_bytes
+            del self.last_used[model_id]
+            evicted.append((model_id, model_bytes))
+        if total > self.memory_budget_bytes:
+            log.warning(
+                "<MGR51630874W>",
+                "Loaded models use %d bytes (budget %d) and none are idle to evict",
+                total,
+                self.memory_budget_bytes,
+            )
+        return evicted
+
+    def _unload_evicted(self, model_id: str, model_bytes: int) -> None:
+        """Unload an evicted model, unless a request used it since it was chosen. A
+        later request for it waits, then loads it again."""
+        with self._load_lock(model_id):
+            with self._lock:
+                if model_id in self.last_used:  # Used again, so no longer idle
+                    self.model_bytes[model_id] = model_bytes
+                    return
+            log.info("<MGR51630873I>", "Evicting idle model '%s'", model_id)
+            # In-flight requests keep their reference until they finish
+            self.unload_model(model_id)
@@ -0,0 +1,177 @@
+# Copyright The Caikit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+# Standard
+import inspect
+import json
+import os
+import shutil
+
+# Third Party
+from PIL import Image
+from transformers import AutoConfig, PreTrainedTokenizerBase, modeling_outputs
+import torch
+
+# First Party
+import alog
+
+# Local
+from caikit.config import get_config
+
+log = alog.use_channel("ONNX")
+
+BACKENDS = ("torch", "onnxruntime")
+DEFAULT_ONNX_CACHE_DIR = "~/.cache/caikit_huggingface_demo/onnx"
+MODEL_FILE = "model.onnx"
+METADATA_FILE = "onnx_metadata.json"
+OPSET = 14
+
+
+def check_backend(backend: str, precision: str = "fp32") -> str:
+    if backend not in BACKENDS:
+        raise ValueError(f"Unsupported backend '{backend}'. Expected one of {BACKENDS}")
+    if backend == "onnxruntime" and precision != "fp32":
+        raise ValueError(f"precision {precision} is only supported by backend: torch")
+    return backend
+
+
+def export_path(kind: str, name: str, revision: str) -> str:
+    """Where the ONNX export of kind (auto class), name and revision is cached"""
+    cache_dir = get_config().get("onnx_cache_dir") or DEFAULT_ONNX_CACHE_DIR
+    dir_name = f"{kind}--{name}--{revision or 'main'}".replace("/", "--")
+    return os.path.join(os.path.expanduser(cache_dir), dir_name)
+
+
+class OnnxModel(torch.nn.Module):
+    """An exported model run by ONNX Runtime behind the PreTrainedModel call
+    interface that the modules and pipelines use (keyword tensors in, the same
+    ModelOutput class out), so their outputs do not change."""
+
+    def __init__(self, path: str) -> None:
+        super().__init__()
+        try:
+            # Third Party
+            import onnxruntime  # pylint: disable=import-outside-toplevel
+        except ImportError as e:
+            raise ImportError(
+                "backend: onnxruntime requires the onnxruntime package"
+            ) from e
+
+        with open(os.path.join(path, METADATA_FILE), encoding="utf-8") as f:
+            metadata = json.load(f)
+        self.config = AutoConfig.from_pretrained(path)
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(path, MODEL_FILE), providers=["CPUExecutionProvider"]
+        )
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        self.output_names = metadata["output_names"]
+        self.output_class = getattr(modeling_outputs, metadata["output_class"])
+        self.main_input_name = self.input_names[0]
+        self.path = path
+
+    @property
+    def device(self) -> torch.device:
+        return torch.device("cpu")
+
+    @property
+    def dtype(self) -> torch.dtype:
+        return torch.float32
+
+    def can_generate(self) -> bool:
+        return False
+
+    def session_bytes(self) -> int:
+        """Estimated memory of the ONNX Runtime session: the size of the exported
+        model, whose initializers (the weights) the session holds"""
+        return os.path.getsize(os.path.join(self.path, MODEL_FILE))
+
+    def forward(self, return_dict=True, **inputs):
+        feed = {name: inputs[name].cpu().numpy() for name in self.input_names}
+        outputs = self.session.run(self.output_names, feed)
+        outputs = [torch.from_numpy(output) for output in outputs]
+        if not return_dict:
+            return tuple(outputs)
+        return self.output_class(**dict(zip(self.output_names, outputs)))
+
+
+def example_inputs(processor) -> dict:
+    """A batch of 2 example inputs (so the batch dimension is not specialized)"""
+    if isinstance(processor, PreTrainedTokenizerBase):
+        texts = ["An example input to export.", "Another one."]
+        return dict(processor(texts, padding=True, return_tensors="pt"))
+    images = [Image.new("RGB", (224, 224))] * 2
+    return dict(processor(images=images, return_tensors="pt"))
+
+
+def export(auto_class, name: str, revision: str, processor_class, path: str) -> None:
+    """Export auto_class.from_pretrained(name) to ONNX with its config and processor
+    (tokenizer or image processor), so later loads need nothing else"""
+    log.info("<ONX80132417I>", "Exporting %s %s to ONNX at %s", auto_class, name, path)
+    model = auto_class.from_pretrained(name, revision=revision).eval()
+    processor = processor_class.from_pretrained(name, revision=revision)
+    accepted = inspect.signature(model.forward).parameters
+    inputs = {k: v for k, v in example_inputs(processor).items() if k in accepted}
+    with torch.no_grad():
+        outputs = model(**inputs, return_dict=True)
+    output_names = list(outputs.keys())
+
+    # Text has a dynamic sequence dimension (images are resized by the processor)
+    text = isinstance(processor, PreTrainedTokenizerBase)
+    dynamic_axes = {
+        k: {0: "batch", 1: "sequence"} if text else {0: "batch"} for k in inputs
+    }
+    for k, v in outputs.items():
+        dynamic_axes[k] = (
+            {0: "batch", 1: "sequence"} if text and v.ndim > 2 else {0: "batch"}
+        )
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    os.makedirs(tmp_path, exist_ok=True)
+    try:
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                (inputs,),  # A trailing dict is passed as keyword args
+                os.path.join(tmp_path, MODEL_FILE),
+                input_names=list(inputs),
+                output_names=output_names,
+                dynamic_axes=dynamic_axes,
+                opset_version=OPSET,
+            )
+        model.config.save_pretrained(tmp_path)
+        processor.save_pretrained(tmp_path)
+        with open(os.path.join(tmp_path, METADATA_FILE), "w", encoding="utf-8") as f:
+            metadata = {
+                "output_class": type(outputs).__name__,
+                "output_names": output_names,
+            }
+            json.dump(metadata, f)
+        try:
+            os.replace(tmp_path, path)  # Complete exports only
+        except OSError:
+            if not os.path.exists(os.path.join(path, MODEL_FILE)):
+                raise
+            # Another process finished the same export first
+    finally:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def load(auto_class, name: str, revision: str, processor_class) -> OnnxModel:
+    """Return the OnnxModel for name and revision. The first load exports the model.
+    Later loads only read the export (no network or PyTorch weights). Load the
+    processor with processor_class.from_pretrained(model.path)."""
+    path = export_path(auto_class.__name__, name, revision)
+    if not os.path.exists(os.path.join(path, MODEL_FILE)):
+        export(auto_class, name, revision, processor_class, path)
+    return OnnxModel(path)
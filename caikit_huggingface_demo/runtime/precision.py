@@ -0,0 +1,139 @@
+# Copyright The Caikit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+# Standard
+import copyreg
+import os
+
+# Third Party
+import torch
+
+# First Party
+import alog
+
+# Local
+from caikit.config import get_config
+
+log = alog.use_channel("PRECISION")
+
+PRECISIONS = ("fp32", "bf16", "int8-dynamic")
+DEFAULT_QUANTIZED_CACHE_DIR = "~/.cache/caikit_huggingface_demo/quantized"
+
+
+def _qscheme(name: str) -> torch.qscheme:
+    return getattr(torch, name)
+
+
+# Pickle quantization schemes (e.g. torch.per_tensor_affine) by name. By default
+# pickle searches sys.modules for them, which fails on modules whose __getattr__
+# raises something else than AttributeError (e.g. caikit's).
+copyreg.pickle(torch.qscheme, lambda qscheme: (_qscheme, (str(qscheme)[6:],)))
+
+
+def check_precision(precision: str) -> str:
+    if precision not in PRECISIONS:
+        raise ValueError(
+            f"Unsupported precision '{precision}'. Expected one of {PRECISIONS}"
+        )
+    return precision
+
+
+def load_kwargs(precision: str) -> dict:
+    """from_pretrained (or pipeline) kwargs to load weights in precision"""
+    return {"torch_dtype": torch.bfloat16} if precision == "bf16" else {}
+
+
+def quantize(model):
+    """Dynamic int8 quantization of the Linear layers (weights int8, activations
+    quantized on the fly) for faster CPU matmuls and ~4x smaller Linear weights"""
+    return torch.ao.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8
+    )
+
+
+def float32_io(model):
+    """Let a bf16 model take and return float32 tensors, so pipeline pre- and
+    post-processing (e.g. image processors and numpy conversions) work unchanged"""
+
+    def cast(value, dtype):
+        if torch.is_tensor(value) and value.is_floating_point():
+            return value.to(dtype)
+        return value
+
+    def cast_inputs(module, args, kwargs):
+        return (
+            tuple(cast(a, module.dtype) for a in args),
+            {k: cast(v, module.dtype) for k, v in kwargs.items()},
+        )
+
+    def cast_outputs(_module, _args, output):
+        # Only top level tensors (e.g. logits). Caches stay in the model dtype.
+        for key, value in output.items():
+            output[key] = cast(value, torch.float32)
+        return output
+
+    model.register_forward_pre_hook(cast_inputs, with_kwargs=True)
+    model.register_forward_hook(cast_outputs)
+    return model
+
+
+def quantized_cache_path(kind: str, name: str, revision: str) -> str:
+    """Where the quantized model for kind (class or pipeline task), name and revision
+    is cached. The torch version is part of the name since pickles are not portable."""
+    cache_dir = get_config().get("quantized_cache_dir") or DEFAULT_QUANTIZED_CACHE_DIR
+    file_name = f"{kind}--{name}--{revision or 'main'}--torch-{torch.__version__}.pt"
+    return os.path.join(os.path.expanduser(cache_dir), file_name.replace("/", "--"))
+
+
+def load_quantized(path: str):
+    """Load a cached quantized model or return None"""
+    if not os.path.exists(path):
+        return None
+    try:
+        log.info("<PRC55218901I>", "Loading quantized model from %s", path)
+        return torch.load(path, weights_only=False)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        # A stale or partial cache file is not fatal. Quantize again.
+        log.warning("<PRC55218902W>", "Ignoring quantized cache %s: %s", path, e)
+        return None
+
+
+def save_quantized(model, path: str) -> None:
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            torch.save(model, tmp_path)
+            os.replace(tmp_path, path)  # Atomic, so readers never see a partial file
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        # Only a cache. Loading the model still works.
+        log.warning("<PRC55218903W>", "Not caching quantized model %s: %s", path, e)
+
+
+def from_pretrained(auto_class, name: str, revision: str, precision: str, **kwargs):
+    """auto_class.from_pretrained() in precision. int8-dynamic models are cached on
+    disk so later starts skip loading the float weights and quantizing."""
+    if precision != "int8-dynamic":
+        return auto_class.from_pretrained(
+            name, revision=revision, **load_kwargs(precision), **kwargs
+        )
+    path = quantized_cache_path(auto_class.__name__, name, revision)
+    model = load_quantized(path)
+    if model is None:
+        model = quantize(auto_class.from_pretrained(name, revision=revision, **kwargs))
+        save_quantized(model, path)
+    return model
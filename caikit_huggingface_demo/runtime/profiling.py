@@ -0,0 +1,251 @@
+# Copyright The Caikit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+
+# Standard
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+import cProfile
+import functools
+import itertools
+import os
+import random
+import threading
+import time
+
+# Third Party
+import torch
+
+# First Party
+import alog
+
+# Local
+from caikit.config import get_config
+from caikit.core import ModuleBase
+
+log = alog.use_channel("PROFILING")
+
+DEFAULT_OUTPUT_DIR = "~/.cache/caikit_huggingface_demo/profiles"
+DEFAULT_MAX_DURATION_S = 600
+DEFAULT_MAX_REQUESTS = 100
+
+
+@dataclass
+class ProfileWindow:
+    """Which inference calls to profile: calls of model_id (or of any model) until
+    the deadline, each with probability sample_rate, at most max_requests"""
+
+    model_id: Optional[str]
+    deadline: float  # time.monotonic()
+    sample_rate: float
+    max_requests: int
+    torch_trace: bool
+    profiled: int = 0
+
+
+class _Capture:
+    """cProfile (and optionally torch profiler) capture of one inference call. The
+    cProfile part can be paused while a streaming call waits for its consumer."""
+
+    def __init__(self, torch_trace: bool) -> None:
+        self.profile = cProfile.Profile()
+        self.torch_profile = None
+        if torch_trace:
+            self.torch_profile = torch.profiler.profile(
+                activities=[torch.profiler.ProfilerActivity.CPU], record_shapes=True
+            )
+            self.torch_profile.start()
+
+    def save(self, path_prefix: str) -> List[str]:
+        paths = [f"{path_prefix}.prof"]
+        self.profile.dump_stats(paths[0])
+        if self.torch_profile:
+            self.torch_profile.stop()
+            paths.append(f"{path_prefix}.trace.json")
+            self.torch_profile.export_chrome_trace(paths[1])
+        return paths
+
+
+class RequestProfiler:
+    """Profiles sampled inference calls during a window started on demand (see the
+    admin endpoint in admin.py). Each profiled call is written to the
+    profiling.output_dir as a cProfile stats file (open it with pstats or
+    snakeviz) and, with torch_trace, a torch profiler Chrome trace.
+
+    Overhead is bounded: outside a window a call only checks the window, calls
+    are sampled, a window has at most max_requests profiled calls and lasts at
+    most max_duration_s, and only one call is profiled at a time.
+
+    cProfile sees the thread running the call, so work handed to other threads
+    (e.g. streamed generation) only shows up in the torch trace.
+    """
+
+    def __init__(self) -> None:
+        self.window: Optional[ProfileWindow] = None
+        self.files = deque(maxlen=100)  # Most recent profile files
+        self._lock = threading.Lock()
+        self._busy = threading.Lock()  # Held while a call is being profiled
+        self._count = itertools.count(1)
+
+    def start(
+        self,
+        model_id: Optional[str] = None,
+        duration_s: float = 60,
+        sample_rate: float = 1.0,
+        max_requests: int = 10,
+        torch_trace: bool = False,
+    ) -> dict:
+        """Profile calls of model_id (or of all models) for the next duration_s"""
+        config = get_config().get("profiling") or {}
+        max_duration_s = config.get("max_duration_s", DEFAULT_MAX_DURATION_S)
+        limit = config.get("max_requests", DEFAULT_MAX_REQUESTS)
+        if not 0 < duration_s <= max_duration_s:
+            raise ValueError(f"duration_s must be in (0, {max_duration_s}]")
+        if not 0 < sample_rate <= 1:
+            raise ValueError("sample_rate must be in (0, 1]")
+        if not 0 < max_requests <= limit:
+            raise ValueError(f"max_requests must be in [1, {limit}]")
+        with self._lock:
+            self.window = ProfileWindow(
+                model_id=model_id or None,
+                deadline=time.monotonic() + duration_s,
+                sample_rate=sample_rate,
+                max_requests=max_requests,
+                torch_trace=torch_trace,
+            )
+        log.info(
+            "<PRF20817405I>",
+            "Profiling %s for %ss (sample rate %s, at most %d calls)",
+            model_id or "all models",
+            duration_s,
+            sample_rate,
+            max_requests,
+        )
+        return self.status()
+
+    def stop(self) -> dict:
+        with self._lock:
+            self.window = None
+        return self.status()
+
+    def status(self) -> dict:
+        with self._lock:
+            window = self.window
+            if window and not self._open(window):
+                window = self.window = None
+            if window:
+                window = asdict(window)
+                deadline = window.pop("deadline")
+                window["remaining_s"] = round(deadline - time.monotonic(), 3)
+            return {
+                "window": window,
+                "output_dir": self.output_dir(),
+                "files": list(self.files),
+            }
+
+    @staticmethod
+    def output_dir() -> str:
+        config = get_config().get("profiling") or {}
+        return os.path.expanduser(config.get("output_dir") or DEFAULT_OUTPUT_DIR)
+
+    def install(self, module: ModuleBase, model_id: str, methods: Dict[str, bool]):
+        """Wrap the module's inference methods (names mapped to whether they stream
+        output) so that sampled calls are profiled"""
+        for method_name, output_streaming in methods.items():
+            method = getattr(module, method_name)
+            wrapped = (
+                self._profile_stream(method, model_id)
+                if output_streaming
+                else self._profile_call(method, model_id)
+            )
+            setattr(module, method_name, wrapped)
+
+    @staticmethod
+    def _open(window: ProfileWindow) -> bool:
+        return (
+            time.monotonic() < window.deadline and window.profiled < window.max_requests
+        )
+
+    def _claim(self, model_id: str) -> Optional[ProfileWindow]:
+        """The window if this call of model_id is to be profiled (then the caller
+        holds _busy and must call _finish)"""
+        window = self.window
+        if window is None:  # The common case, without taking the lock
+            return None
+        with self._lock:
+            window = self.window
+            if (
+                window is None
+                or not self._open(window)
+                or window.model_id not in (None, model_id)
+                or random.random() >= window.sample_rate
+                or not self._busy.acquire(blocking=False)
+            ):
+                return None
+            window.profiled += 1
+            return window
+
+    def _finish(self, model_id: str, capture: _Capture) -> None:
+        try:
+            output_dir = self.output_dir()
+            os.makedirs(output_dir, exist_ok=True)
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            name = f"{model_id}-{stamp}-{os.getpid()}-{next(self._count)}"
+            paths = capture.save(os.path.join(output_dir, name.replace("/", "--")))
+            self.files.extend(paths)
+            log.info("<PRF20817406I>", "Wrote profile %s", paths)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            # Profiling must not fail the request
+            log.warning("<PRF20817407W>", "Could not save profile: %s", e)
+        finally:
+            self._busy.release()
+
+    def _profile_call(self, method, model_id: str):
+        @functools.wraps(method)
+        def profile_call(*args, **kwargs):
+            window = self._claim(model_id)
+            if window is None:
+                return method(*args, **kwargs)
+            capture = _Capture(window.torch_trace)
+            try:
+                return capture.profile.runcall(method, *args, **kwargs)
+            finally:
+                self._finish(model_id, capture)
+
+        return profile_call
+
+    def _profile_stream(self, method, model_id: str):
+        @functools.wraps(method)
+        def profile_stream(*args, **kwargs):
+            window = self._claim(model_id)
+            if window is None:
+                yield from method(*args, **kwargs)
+                return
+            capture = _Capture(window.torch_trace)
+            try:
+                items = iter(capture.profile.runcall(method, *args, **kwargs))
+                while True:
+                    try:
+                        item = capture.profile.runcall(next, items)
+                    except StopIteration:
+                        return
+                    yield item
+            finally:
+                self._finish(model_id, capture)
+
+        return profile_stream
+
+
+PROFILER = RequestProfiler()
@@ -0,0 +1,66 @@
+# Copyright The Caikit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+# Standard
+from collections import OrderedDict
+from typing import Any, Callable
+import threading
+import time
+
+
+class SessionStore:
+    """Thread-safe map of session id to session state with LRU and idle-TTL eviction."""
+
+    def __init__(
+        self, factory: Callable[[], Any], max_sessions: int = 64, ttl_s: float = 1800
+    ) -> None:
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.ttl_s = ttl_s
+        self._sessions: "OrderedDict[str, list]" = (
+            OrderedDict()
+        )  # id -> [last_used, session]
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Any:
+        """Return the session for this id, creating it if needed (and evicting others)"""
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                entry = [now, self.factory()]
+                self._sessions[session_id] = entry
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)  # Least recently used
+            else:
+                entry[0] = now
+                self._sessions.move_to_end(session_id)
+            return entry[1]
+
+    def remove(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+    def _evict_expired(self, now: float) -> None:
+        # Oldest entries are first, so stop at the first one that is still fresh
+        while self._sessions:
+            session_id, (last_used, _) = next(iter(self._sessions.items()))
+            if now - last_used <= self.ttl_s:
+                break
+            del self._sessions[session_id]
@@ -0,0 +1,328 @@
+# Copyright The Caikit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+
+# Standard
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional, Tuple
+import copy
+import functools
+import inspect
+import time
+import weakref
+
+# Third Party
+from prometheus_client import Histogram
+
+# Local
+from caikit.core import ModuleBase
+
+SECONDS_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+SIZE_BUCKETS = tuple(4**i for i in range(13))  # 1 to 16M
+
+STAGE_SECONDS = Histogram(
+    "inference_stage_seconds",
+    "Time per request spent in each stage (decode, preprocess, forward, postprocess, "
+    "format, batch) of a model's inference",
+    ["model", "stage"],
+    buckets=SECONDS_BUCKETS,
+)
+SERVICE_SECONDS = Histogram(
+    "inference_service_seconds",
+    "Time per request spent running a model's inference method",
+    ["model"],
+    buckets=SECONDS_BUCKETS,
+)
+QUEUE_WAIT_SECONDS = Histogram(
+    "inference_queue_wait_seconds",
+    "Time per request from its RPC's model lookup until the model starts on it "
+    "(waiting for a model load, an executor thread or a batch)",
+    ["model"],
+    buckets=SECONDS_BUCKETS,
+)
+INPUT_SIZE = Histogram(
+    "inference_input_size",
+    "Input size per request (tokens, pixels or sentences)",
+    ["model", "unit"],
+    buckets=SIZE_BUCKETS,
+)
+OUTPUT_SIZE = Histogram(
+    "inference_output_size",
+    "Output size per request (tokens, chunks, classes, objects or vectors)",
+    ["model", "unit"],
+    buckets=SIZE_BUCKETS,
+)
+
+
+class Arrival:
+    """When an RPC looked up its model. The first instrumented call of the RPC takes
+    it to start its queue wait."""
+
+    def __init__(self, model_id: str) -> None:
+        self.model_id = model_id
+        self.time = time.perf_counter()
+        self.taken = False
+
+
+# Context variables rather than thread-locals, so that they follow a request into
+# the threads that run it (see ModelExecutor and TextGeneration.run_stream_out)
+_request: ContextVar[Optional["_Request"]] = ContextVar("request", default=None)
+_arrival: ContextVar[Optional[Arrival]] = ContextVar("arrival", default=None)
+# The arrival of the last for_request() module in this context, and that module
+_pending: ContextVar[Optional[Tuple[Arrival, weakref.ref]]] = ContextVar(
+    "pending", default=None
+)
+
+
+class _Request:
+    """Queue wait, stage times and sizes of the request running in this context,
+    observed once when it ends"""
+
+    def __init__(self, model_id: str) -> None:
+        self.model_id = model_id
+        self.queue_wait: Optional[float] = None
+        self.batch_wait = 0.0  # Part of queue_wait inside the inference call
+        self.stages: Dict[str, float] = {}
+        self.inputs: Dict[str, int] = {}
+        self.outputs: Dict[str, int] = {}
+
+    def observe(self, service_seconds: float) -> None:
+        if self.queue_wait is not None:
+            QUEUE_WAIT_SECONDS.labels(model=self.model_id).observe(self.queue_wait)
+        SERVICE_SECONDS.labels(model=self.model_id).observe(
+            service_seconds - self.batch_wait
+        )
+        for name, seconds in self.stages.items():
+            STAGE_SECONDS.labels(model=self.model_id, stage=name).observe(seconds)
+        for unit, n in self.inputs.items():
+            INPUT_SIZE.labels(model=self.model_id, unit=unit).observe(n)
+        for unit, n in self.outputs.items():
+            OUTPUT_SIZE.labels(model=self.model_id, unit=unit).observe(n)
+
+
+def _current() -> Optional[_Request]:
+    return _request.get()
+
+
+def arrive(model_id: str) -> Arrival:
+    """The arrival of the RPC looking up model_id in this context. caikit looks the
+    model up twice per RPC (in Predict, then in predict_model), so the arrival is
+    kept while the module from the first lookup is held and its call has not
+    taken it."""
+    pending = _pending.get()
+    if pending is not None:
+        arrival, module = pending
+        if arrival.model_id == model_id and not arrival.taken and module() is not None:
+            return arrival
+    return Arrival(model_id)
+
+
+def for_request(module: ModuleBase, arrival: Arrival, methods: Dict[str, bool]):
+    """A shallow copy of module for one RPC, whose inference methods (names mapped
+    to whether they stream output) start their queue wait at arrival. caikit runs
+    them on a new thread (see use_abortable_threads), which does not inherit the
+    context of the RPC, so the methods carry the arrival there."""
+    request_module = copy.copy(module)
+    for method_name, output_streaming in methods.items():
+        method = getattr(module, method_name)
+        if output_streaming:
+            wrapped = _arrived_stream(method, arrival)
+        else:
+            wrapped = _arrived(method, arrival)
+        setattr(request_module, method_name, wrapped)
+    _pending.set((arrival, weakref.ref(request_module)))
+    return request_module
+
+
+def _arrived(method, arrival: Arrival):
+    @functools.wraps(method)
+    def call(*args, **kwargs):
+        token = _arrival.set(arrival)
+        try:
+            return method(*args, **kwargs)
+        finally:
+            _arrival.reset(token)
+
+    return call
+
+
+def _arrived_stream(method, arrival: Arrival):
+    @functools.wraps(method)
+    def stream(*args, **kwargs):
+        # Wrapped methods may only start when the first item is requested
+        items = iter(_arrived(method, arrival)(*args, **kwargs))
+        while True:
+            token = _arrival.set(arrival)
+            try:
+                item = next(items)
+            except StopIteration:
+                return
+            finally:
+                _arrival.reset(token)
+            yield item
+
+    return stream
+
+
+def _start(request: _Request) -> None:
+    """Set the request's queue wait from the arrival of its RPC, if any"""
+    arrival = _arrival.get()
+    if arrival is not None and not arrival.taken:
+        arrival.taken = True
+        request.queue_wait = time.perf_counter() - arrival.time
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Add the time spent in the block to the current request's stage. Stages
+    entered more than once (e.g. per pipeline item) are summed. Does nothing
+    outside of an instrumented inference call (e.g. on batcher threads)."""
+    if _current() is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_stage(name, time.perf_counter() - start)
+
+
+def add_stage(name: str, seconds: float) -> None:
+    """Add seconds to the current request's stage"""
+    request = _current()
+    if request is not None:
+        request.stages[name] = request.stages.get(name, 0.0) + seconds
+
+
+def observe_input(n: int, unit: str) -> None:
+    """Add n units (tokens, pixels or sentences) to the current request's input size"""
+    request = _current()
+    if request is not None:
+        request.inputs[unit] = request.inputs.get(unit, 0) + n
+
+
+def observe_output(n: int, unit: str) -> None:
+    """Add n units (tokens, chunks, classes, objects or vectors) to the current
+    request's output size"""
+    request = _current()
+    if request is not None:
+        request.outputs[unit] = request.outputs.get(unit, 0) + n
+
+
+def observe_batch_wait(seconds: float) -> None:
+    """Move time the current request spent waiting for its batch to start from its
+    service time to its queue wait"""
+    request = _current()
+    if request is not None:
+        request.queue_wait = (request.queue_wait or 0.0) + seconds
+        request.batch_wait += seconds
+
+
+def install(module: ModuleBase, model_id: str, methods: Dict[str, bool]) -> None:
+    """Measure each call of the module's inference methods (names mapped to whether
+    they stream output) as one request of model_id. Like ModelExecutor.install,
+    the instance attributes shadow the class methods."""
+    for method_name, output_streaming in methods.items():
+        method = getattr(module, method_name)
+        if output_streaming or inspect.isgeneratorfunction(method):
+            wrapped = _measure_stream(method, model_id)
+        else:
+            wrapped = _measure(method, model_id)
+        setattr(module, method_name, wrapped)
+
+
+def _measure(method, model_id: str):
+    @functools.wraps(method)
+    def measure(*args, **kwargs):
+        if _current() is not None:  # Already measured by an outer call
+            return method(*args, **kwargs)
+        request = _Request(model_id)
+        _start(request)
+        token = _request.set(request)
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            _request.reset(token)
+            request.observe(time.perf_counter() - start)
+
+    return measure
+
+
+def _measure_stream(method, model_id: str):
+    @functools.wraps(method)
+    def measure(*args, **kwargs):
+        request = _Request(model_id)
+        _start(request)
+        service_seconds = 0.0
+        items = iter(method(*args, **kwargs))
+        try:
+            while True:
+                # Only time spent producing items counts, not the consumer's
+                token = _request.set(request)
+                start = time.perf_counter()
+                try:
+                    item = next(items)
+                except StopIteration:
+                    return
+                finally:
+                    service_seconds += time.perf_counter() - start
+                    _request.reset(token)
+                yield item
+        finally:
+            request.observe(service_seconds)
+
+    return measure
+
+
+def instrument_pipeline(pipe):
+    """Time a Hugging Face pipeline's preprocess, forward and postprocess steps
+    (and count the input tokens) for whichever request calls it. Pipelines are
+    shared, so call this once where the pipeline is created."""
+
+    def timed(name, step, count_tokens=False):
+        @functools.wraps(step)
+        def run_step(*args, **kwargs):
+            with stage(name):
+                result = step(*args, **kwargs)
+            if count_tokens and isinstance(result, dict) and "input_ids" in result:
+                input_ids = result["input_ids"]
+                observe_input(
+                    getattr(input_ids, "numel", input_ids.__len__)(), "tokens"
+                )
+            return result
+
+        return run_step
+
+    pipe.preprocess = timed("preprocess", pipe.preprocess, count_tokens=True)
+    pipe._forward = timed("forward", pipe._forward)  # pylint: disable=protected-access
+    pipe.postprocess = timed("postprocess", pipe.postprocess)
+    return pipe
@@ -14,9 +14,9 @@
 
 # Local
 from .conversational import Conversational
-from .image_classification import ImageClassification
+from .image_classification import ImageClassification, ImageClassificationBatch
 from .image_segmentation import ImageSegmentation
-from .object_detection import ObjectDetection
+from .object_detection import ObjectDetection, ObjectDetectionBatch
 from .sentence_similarity import SentenceSimilarity
 from .sentiment import Sentiment
 from .summarization import Summarization
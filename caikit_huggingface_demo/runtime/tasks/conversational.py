@@ -12,14 +12,21 @@
 # See the License for the specific language governing permissions and
 # limitations under the License
 
+# Standard
+from collections import deque
+import threading
+
 # Third Party
 from module_ids import CONVERSATIONAL
+from runtime import stage_metrics
 from runtime.data_model.results import Text
 from runtime.hf_base import HFBase
-from transformers import Conversation, pipeline
+from runtime.session_store import SessionStore
+from transformers import Conversation
+import torch
 
 # Local
-from caikit.core import ModuleBase, TaskBase, module, task
+from caikit.core import ModuleBase, ModuleConfig, TaskBase, module, task
 
 TASK = "conversational"
 
@@ -37,6 +44,24 @@ DEFAULT_MODEL = "microsoft/DialoGPT-small"
 # Hard-coded revision to prevent download every revision bump.
 DEFAULT_MODEL_REVISION = "4e936e3a11f8e077b31eec8f045499c92c7cf087"
 
+# Session defaults (overridable in the model config.yml)
+DEFAULT_MAX_SESSIONS = 64
+DEFAULT_SESSION_TTL_S = 1800
+DEFAULT_MAX_HISTORY_TOKENS = 512
+DEFAULT_MAX_NEW_TOKENS = 128
+
+
+class ConversationSession:
+    """Server-side state for one conversation"""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()  # One turn at a time per session
+        self.input_ids = []  # Token history (each turn ends with eos)
+        self.turn_lengths = deque()  # Tokens per turn (or exchange), to truncate
+        self.past_key_values = None  # KV cache covering input_ids[:cached_len]
+        self.cached_len = 0
+        self.conversation = Conversation()  # Used when the KV cache is not reusable
+
 
 @module(CONVERSATIONAL, TASK, "0.0.0", ConversationalTask)
 class Conversational(HFBase, ModuleBase):
@@ -45,13 +70,130 @@ class Conversational(HFBase, ModuleBase):
         hf_model, hf_revision = self.read_config(
             model_config_path, DEFAULT_MODEL, DEFAULT_MODEL_REVISION
         )
-        self.pipe = pipeline(task=TASK, model=hf_model, revision=hf_revision)
+        compile_options = self.read_compile_options(model_config_path)
+        self.pipe = self.shared_pipeline(
+            task=TASK,
+            model=hf_model,
+            revision=hf_revision,
+            precision=self.read_precision(model_config_path),
+            compile_options=compile_options,
+        )
+        self.warmup_generate(self.pipe.model, self.pipe.tokenizer, compile_options)
+
+        config = ModuleConfig.load(model_config_path)
+        self.max_history_tokens = config.get(
+            "max_history_tokens", DEFAULT_MAX_HISTORY_TOKENS
+        )
+        self.max_new_tokens = config.get("max_new_tokens", DEFAULT_MAX_NEW_TOKENS)
+        self.sessions = SessionStore(
+            ConversationSession,
+            max_sessions=config.get("max_sessions", DEFAULT_MAX_SESSIONS),
+            ttl_s=config.get("session_ttl_s", DEFAULT_SESSION_TTL_S),
+        )
+        # Past key/values can only be extended turn by turn for decoder-only models
+        self.reuse_cache = config.get("session_reuse_cache", True) and not getattr(
+            self.pipe.model.config, "is_encoder_decoder", False
+        )
+
+    def run(
+        self, text_in: str, session_id: str = ""
+    ) -> Text:  # pylint: disable=arguments-differ
+        """Respond to text_in. With a session_id, earlier turns of that session are used as
+        context (kept on the server, so clients only send the new input)."""
+        if not session_id:
+            conversation = Conversation()
+            conversation.add_user_input(text_in)
+            conversation = self.pipe(conversation)
+            return Text(conversation.generated_responses[-1])
+
+        session = self.sessions.get(session_id)
+        with session.lock:
+            if self.reuse_cache:
+                return Text(self._cached_turn(session, text_in))
+
+            return Text(self._pipeline_turn(session, text_in))
+
+    def _pipeline_turn(self, session: ConversationSession, text_in: str) -> str:
+        """Generate a response with the pipeline, which encodes the whole history.
+        The oldest exchanges are dropped to stay within max_history_tokens."""
+        tokenizer = self.pipe.tokenizer
+        input_length = len(tokenizer.encode(text_in, add_special_tokens=False)) + 1
+        conversation = session.conversation
+        # Here turn_lengths holds the tokens of each exchange (input and response)
+        total = sum(session.turn_lengths) + input_length
+        dropped = 0
+        while total > self.max_history_tokens and session.turn_lengths:
+            total -= session.turn_lengths.popleft()
+            dropped += 1
+        if dropped:
+            del conversation.past_user_inputs[:dropped]
+            del conversation.generated_responses[:dropped]
 
-    def run(self, text_in: str) -> Text:  # pylint: disable=arguments-differ
-        conversation = Conversation()
         conversation.add_user_input(text_in)
-        conversation = self.pipe(conversation)
-        return Text(conversation.generated_responses[-1])
+        session.conversation = conversation = self.pipe(conversation)
+        response = conversation.generated_responses[-1]
+        session.turn_lengths.append(
+            input_length + len(tokenizer.encode(response, add_special_tokens=False)) + 1
+        )
+        return response
+
+    def _cached_turn(self, session: ConversationSession, text_in: str) -> str:
+        """Generate a response, only encoding the tokens that are new since the last turn"""
+        tokenizer = self.pipe.tokenizer
+        model = self.pipe.model
+        eos = tokenizer.eos_token_id
+
+        with stage_metrics.stage("preprocess"):
+            turn_ids = tokenizer.encode(text_in, add_special_tokens=False) + [eos]
+        stage_metrics.observe_input(len(turn_ids), "tokens")
+        self._append_turn(session, turn_ids)
+        history = session.input_ids
+        input_ids = torch.tensor([history], device=model.device)
+
+        with torch.no_grad(), stage_metrics.stage("forward"):
+            # Extend the cache over all but the last token; generate() feeds the last one
+            past = session.past_key_values
+            if len(history) - 1 > session.cached_len:
+                past = model(
+                    input_ids[:, session.cached_len : -1],
+                    past_key_values=past,
+                    use_cache=True,
+                ).past_key_values
+            generate_kwargs = {"past_key_values": past} if past is not None else {}
+            output_ids = model.generate(
+                input_ids,
+                attention_mask=torch.ones_like(input_ids),
+                max_new_tokens=self.max_new_tokens,
+                pad_token_id=eos,
+                **generate_kwargs,
+            )[0]
+
+        session.past_key_values = past
+        session.cached_len = len(history) - 1 if past is not None else 0
+
+        response_ids = output_ids[len(history) :].tolist()
+        if not response_ids or response_ids[-1] != eos:
+            response_ids.append(eos)
+        self._append_turn(session, response_ids)
+        stage_metrics.observe_output(len(response_ids), "tokens")
+        with stage_metrics.stage("postprocess"):
+            return tokenizer.decode(response_ids, skip_special_tokens=True)
+
+    def _append_turn(self, session: ConversationSession, turn_ids) -> None:
+        """Add a turn, dropping the oldest turns to stay within max_history_tokens"""
+        session.input_ids = session.input_ids + turn_ids
+        session.turn_lengths.append(len(turn_ids))
+        dropped = 0
+        while (
+            len(session.input_ids) - dropped > self.max_history_tokens
+            and len(session.turn_lengths) > 1
+        ):
+            dropped += session.turn_lengths.popleft()
+        if dropped:
+            # Positions shift, so the cache has to be rebuilt from the kept history
+            session.input_ids = session.input_ids[dropped:]
+            session.past_key_values = None
+            session.cached_len = 0
 
     @classmethod
     def load(cls, model_path):
@@ -12,16 +12,25 @@
 # See the License for the specific language governing permissions and
 # limitations under the License
 
+# Standard
+from typing import List
+
 # Third Party
-from module_ids import IMAGE_CLASSIFICATION
-from runtime.data_model.classification import ClassificationPrediction, ClassInfo
+from module_ids import IMAGE_CLASSIFICATION, IMAGE_CLASSIFICATION_BATCH
+from runtime import stage_metrics
+from runtime.data_model.classification import (
+    ClassificationBatchPrediction,
+    ClassificationPrediction,
+    ClassInfo,
+)
 from runtime.hf_base import HFBase
-from transformers import pipeline
 
 # Local
-from caikit.core import ModuleBase, TaskBase, module, task
+from caikit.core import ModuleBase, ModuleConfig, TaskBase, module, task
 
 TASK = "image-classification"
+
+DEFAULT_BATCH_SIZE = 8
 # DEFAULTS: google/vit-base-patch16-224 and revision 5dca96d
 # facebook/convnext-tiny-224
 
@@ -34,6 +43,24 @@ class ImageClassificationTask(TaskBase):
     pass
 
 
+@task(
+    required_parameters={"encoded_bytes_or_urls": List[str]},
+    output_type=ClassificationBatchPrediction,
+)
+class ImageClassificationBatchTask(TaskBase):
+    pass
+
+
+def to_prediction(raw_results) -> ClassificationPrediction:
+    """Convert one image's pipeline output to a ClassificationPrediction"""
+    class_info = []
+    for result in raw_results:
+        class_info.append(
+            ClassInfo(class_name=result["label"], confidence=result["score"])
+        )
+    return ClassificationPrediction(class_info)
+
+
 @module(IMAGE_CLASSIFICATION, "image_classification", "0.0.0", ImageClassificationTask)
 class ImageClassification(HFBase, ModuleBase):
     """Class to wrap image classification pipeline from Hugging Face"""
@@ -41,26 +68,74 @@ class ImageClassification(HFBase, ModuleBase):
     def __init__(self, model_config_path) -> None:
         super().__init__()
         hf_model, hf_revision = self.read_config(model_config_path, None, None)
-        self.pipe = pipeline(task=TASK, model=hf_model, revision=hf_revision)
+        self.pipe = self.shared_pipeline(
+            task=TASK,
+            model=hf_model,
+            revision=hf_revision,
+            precision=self.read_precision(model_config_path),
+            backend=self.read_backend(model_config_path),
+        )
 
     def run(
-        self, encoded_bytes_or_url: str
+        self, encoded_bytes_or_url: str = "", image_bytes: bytes = b""
     ) -> ClassificationPrediction:  # pylint: disable=arguments-differ
         """Run HF sentiment analysis
         Args:
             encoded_bytes_or_url Encoded image bytes (or url string)
+            image_bytes Raw image file bytes (used instead of encoded_bytes_or_url)
         Returns:
             ClassificationPrediction: predicted classes with their confidence score.
         """
 
-        image = HFBase.get_image_bytes(encoded_bytes_or_url)
+        image = HFBase.get_image(encoded_bytes_or_url, image_bytes)
         raw_results = self.pipe(image)  # , top_k=9)
-        class_info = []
-        for result in raw_results:
-            class_info.append(
-                ClassInfo(class_name=result["label"], confidence=result["score"])
-            )
-        return ClassificationPrediction(class_info)
+        stage_metrics.observe_output(len(raw_results), "classes")
+        return to_prediction(raw_results)
+
+    @classmethod
+    def load(cls, model_config_path):
+        """Load a model"""
+        return cls(model_config_path)
+
+
+@module(
+    IMAGE_CLASSIFICATION_BATCH,
+    "image_classification_batch",
+    "0.0.0",
+    ImageClassificationBatchTask,
+)
+class ImageClassificationBatch(HFBase, ModuleBase):
+    """Class to wrap image classification pipeline from Hugging Face for batches of images"""
+
+    def __init__(self, model_config_path) -> None:
+        super().__init__()
+        hf_model, hf_revision = self.read_config(model_config_path, None, None)
+        self.pipe = self.shared_pipeline(
+            task=TASK,
+            model=hf_model,
+            revision=hf_revision,
+            precision=self.read_precision(model_config_path),
+            backend=self.read_backend(model_config_path),
+        )
+        config = ModuleConfig.load(model_config_path)
+        self.batch_size = config.get("batch_size", DEFAULT_BATCH_SIZE)
+
+    def run(
+        self,
+        encoded_bytes_or_urls: List[str] = None,
+        images_bytes: List[bytes] = None,
+    ) -> ClassificationBatchPrediction:  # pylint: disable=arguments-differ
+        """Run HF image classification on a batch of images
+        Args:
+            encoded_bytes_or_urls Encoded image bytes (or url strings)
+            images_bytes Raw image file bytes (used instead of encoded_bytes_or_urls)
+        Returns:
+            ClassificationBatchPrediction: one prediction per image, in input order.
+        """
+        images = HFBase.get_images(encoded_bytes_or_urls, images_bytes)
+        raw_results = self.pipe(images, batch_size=self.batch_size)
+        stage_metrics.observe_output(sum(len(r) for r in raw_results), "classes")
+        return ClassificationBatchPrediction([to_prediction(r) for r in raw_results])
 
     @classmethod
     def load(cls, model_config_path):
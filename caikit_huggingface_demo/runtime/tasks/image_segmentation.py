@@ -14,12 +14,14 @@
 
 # Third Party
 from module_ids import IMAGE_SEGMENTATION
+from PIL import Image
+from runtime import compilation, stage_metrics
 from runtime.data_model.image_segmentation import ImageSegmentationResult, Mask
 from runtime.hf_base import HFBase
-from transformers import pipeline
+import numpy
 
 # Local
-from caikit.core import ModuleBase, TaskBase, module, task
+from caikit.core import ModuleBase, ModuleConfig, TaskBase, module, task
 
 PIPE_TASK = "image-segmentation"
 TASK_NAME = PIPE_TASK.replace("-", "_")
@@ -32,6 +34,8 @@ TASK_NAME = PIPE_TASK.replace("-", "_")
 DEFAULT_HF_MODEL = "facebook/detr-resnet-50-panoptic"
 DEFAULT_HF_MODEL_REVISION = "fc15262"
 
+MASK_FORMATS = ("png", "rle", "label_map")
+
 
 @task(
     required_parameters={"encoded_bytes_or_url": str},
@@ -50,20 +54,107 @@ class ImageSegmentation(HFBase, ModuleBase):
         hf_model, hf_revision = self.read_config(
             model_config_path, DEFAULT_HF_MODEL, DEFAULT_HF_MODEL_REVISION
         )
-        self.pipe = pipeline(task=PIPE_TASK, model=hf_model, revision=hf_revision)
+        compile_options = self.read_compile_options(model_config_path)
+        self.pipe = self.shared_pipeline(
+            task=PIPE_TASK,
+            model=hf_model,
+            revision=hf_revision,
+            precision=self.read_precision(model_config_path),
+            compile_options=compile_options,
+        )
+        compilation.warmup(
+            self.pipe.model,
+            compile_options,
+            lambda: self.pipe(Image.new("RGB", (64, 64))),
+        )
+        config = ModuleConfig.load(model_config_path)
+        self.mask_format = config.get("mask_format", "png")
+        self.mask_scale = config.get("mask_scale", 1.0)
 
     def run(
-        self, encoded_bytes_or_url: str
+        self,
+        encoded_bytes_or_url: str = "",
+        image_bytes: bytes = b"",
+        mask_format: str = "",
+        mask_scale: float = 0.0,
     ) -> ImageSegmentationResult:  # pylint: disable=arguments-differ
-        image = HFBase.get_image_bytes(encoded_bytes_or_url)
-        results = self.pipe(image, threshold=0.5)
-        objects = [
-            Mask(
-                label=o["label"], score=o["score"], mask=HFBase.encode_image(o["mask"])
+        """Run HF image segmentation
+        Args:
+            encoded_bytes_or_url Encoded image bytes (or url string)
+            image_bytes Raw image file bytes (used instead of encoded_bytes_or_url)
+            mask_format png (one encoded image per mask), rle (run lengths per mask)
+                or label_map (one uint8 map for all masks). Defaults to the model config.
+            mask_scale Downsample rle/label_map masks by this factor in (0, 1]
+        Returns:
+            ImageSegmentationResult: labeled masks with their confidence score.
+        """
+        mask_format = mask_format or self.mask_format
+        mask_scale = mask_scale or self.mask_scale
+        if mask_format not in MASK_FORMATS:
+            raise ValueError(
+                f"Unsupported mask_format '{mask_format}'. Expected one of {MASK_FORMATS}"
             )
-            for o in results
-        ]
-        return ImageSegmentationResult(objects)
+        if not 0 < mask_scale <= 1:
+            raise ValueError(f"mask_scale ({mask_scale}) must be in (0, 1]")
+
+        image = HFBase.get_image(encoded_bytes_or_url, image_bytes)
+        results = self.pipe(image, threshold=0.5)
+        stage_metrics.observe_output(len(results), "objects")
+        with stage_metrics.stage("format"):
+            return self._to_result(image, results, mask_format, mask_scale)
+
+    def _to_result(
+        self, image: Image, results: list, mask_format: str, mask_scale: float
+    ) -> ImageSegmentationResult:
+        """Convert the pipeline's masks to the requested mask_format"""
+        if mask_format == "png":
+            objects = [
+                Mask(
+                    label=o["label"],
+                    score=o["score"],
+                    mask=HFBase.encode_image(o["mask"]),
+                )
+                for o in results
+            ]
+            return ImageSegmentationResult(objects)
+
+        width = max(1, round(image.width * mask_scale))
+        height = max(1, round(image.height * mask_scale))
+        masks = [self._mask_array(o["mask"], width, height) for o in results]
+        if mask_format == "rle":
+            objects = [
+                Mask(label=o["label"], score=o["score"], rle=self._rle(m))
+                for o, m in zip(results, masks)
+            ]
+            return ImageSegmentationResult(objects, width=width, height=height)
+
+        # label_map: paint lowest scores first so higher scores win any overlap
+        if len(results) > 255:
+            raise ValueError("label_map supports at most 255 segments")
+        label_map = numpy.zeros((height, width), dtype=numpy.uint8)
+        for i in sorted(range(len(results)), key=lambda i: results[i]["score"]):
+            label_map[masks[i]] = i + 1
+        objects = [Mask(label=o["label"], score=o["score"]) for o in results]
+        return ImageSegmentationResult(
+            objects, label_map=label_map.tobytes(), width=width, height=height
+        )
+
+    @staticmethod
+    def _mask_array(mask: Image, width: int, height: int) -> numpy.ndarray:
+        """Boolean [height x width] array for a pipeline mask (downsampled if needed)"""
+        if mask.size != (width, height):
+            mask = mask.resize((width, height), Image.NEAREST)
+        return numpy.asarray(mask) > 127
+
+    @staticmethod
+    def _rle(mask: numpy.ndarray) -> list:
+        """Row-major run lengths of a boolean mask, starting with a run of 0s"""
+        flat = mask.ravel()
+        changes = numpy.flatnonzero(flat[1:] != flat[:-1]) + 1
+        runs = numpy.diff(numpy.concatenate(([0], changes, [flat.size])))
+        if flat.size and flat[0]:
+            runs = numpy.concatenate(([0], runs))  # Always start with the 0s run
+        return runs.tolist()
 
     @classmethod
     def load(cls, model_config_path):
@@ -12,18 +12,23 @@
 # See the License for the specific language governing permissions and
 # limitations under the License
 
+# Standard
+from typing import List
+
 # Third Party
-from module_ids import OBJECT_DETECTION
+from module_ids import OBJECT_DETECTION, OBJECT_DETECTION_BATCH
+from PIL import Image
+from runtime import compilation, stage_metrics
 from runtime.data_model.object_detection import (
     Box,
     ObjectDetected,
+    ObjectDetectionBatchResult,
     ObjectDetectionResult,
 )
 from runtime.hf_base import HFBase
-from transformers import pipeline
 
 # Local
-from caikit.core import ModuleBase, TaskBase, module, task
+from caikit.core import ModuleBase, ModuleConfig, TaskBase, module, task
 
 PIPE_TASK = "object-detection"
 TASK_NAME = PIPE_TASK.replace("-", "_")
@@ -36,6 +41,8 @@ TASK_NAME = PIPE_TASK.replace("-", "_")
 DEFAULT_HF_MODEL = "hustvl/yolos-tiny"
 DEFAULT_HF_MODEL_REVISION = "3686e65df0c914833fc8cbeca745a33b374c499b"
 
+DEFAULT_BATCH_SIZE = 8
+
 
 @task(
     required_parameters={"encoded_bytes_or_url": str},
@@ -45,6 +52,23 @@ class ObjectDetectionTask(TaskBase):
     pass
 
 
+@task(
+    required_parameters={"encoded_bytes_or_urls": List[str]},
+    output_type=ObjectDetectionBatchResult,
+)
+class ObjectDetectionBatchTask(TaskBase):
+    pass
+
+
+def to_result(results) -> ObjectDetectionResult:
+    """Convert one image's pipeline output to an ObjectDetectionResult"""
+    objects = [
+        ObjectDetected(label=o["label"], score=o["score"], box=Box(**o["box"]))
+        for o in results
+    ]
+    return ObjectDetectionResult(objects)
+
+
 @module(OBJECT_DETECTION, TASK_NAME, "0.0.0", ObjectDetectionTask)
 class ObjectDetection(HFBase, ModuleBase):
     """Class to wrap object-detection pipeline from Hugging Face"""
@@ -54,18 +78,80 @@ class ObjectDetection(HFBase, ModuleBase):
         hf_model, hf_revision = self.read_config(
             model_config_path, DEFAULT_HF_MODEL, DEFAULT_HF_MODEL_REVISION
         )
-        self.pipe = pipeline(task=PIPE_TASK, model=hf_model, revision=hf_revision)
+        compile_options = self.read_compile_options(model_config_path)
+        self.pipe = self.shared_pipeline(
+            task=PIPE_TASK,
+            model=hf_model,
+            revision=hf_revision,
+            precision=self.read_precision(model_config_path),
+            compile_options=compile_options,
+        )
+        compilation.warmup(
+            self.pipe.model,
+            compile_options,
+            lambda: self.pipe(Image.new("RGB", (64, 64))),
+        )
 
     def run(
-        self, encoded_bytes_or_url: str
+        self, encoded_bytes_or_url: str = "", image_bytes: bytes = b""
     ) -> ObjectDetectionResult:  # pylint: disable=arguments-differ
-        image = HFBase.get_image_bytes(encoded_bytes_or_url)
+        image = HFBase.get_image(encoded_bytes_or_url, image_bytes)
         results = self.pipe(image, threshold=0.5)
-        objects = [
-            ObjectDetected(label=o["label"], score=o["score"], box=Box(**o["box"]))
-            for o in results
-        ]
-        return ObjectDetectionResult(objects)
+        stage_metrics.observe_output(len(results), "objects")
+        return to_result(results)
+
+    @classmethod
+    def load(cls, model_config_path):
+        """Load a model given a Caikit model config dir"""
+        return cls(model_config_path)
+
+
+@module(
+    OBJECT_DETECTION_BATCH,
+    f"{TASK_NAME}_batch",
+    "0.0.0",
+    ObjectDetectionBatchTask,
+)
+class ObjectDetectionBatch(HFBase, ModuleBase):
+    """Class to wrap object-detection pipeline from Hugging Face for batches of images"""
+
+    def __init__(self, model_config_path) -> None:
+        super().__init__()
+        hf_model, hf_revision = self.read_config(
+            model_config_path, DEFAULT_HF_MODEL, DEFAULT_HF_MODEL_REVISION
+        )
+        compile_options = self.read_compile_options(model_config_path)
+        self.pipe = self.shared_pipeline(
+            task=PIPE_TASK,
+            model=hf_model,
+            revision=hf_revision,
+            precision=self.read_precision(model_config_path),
+            compile_options=compile_options,
+        )
+        compilation.warmup(
+            self.pipe.model,
+            compile_options,
+            lambda: self.pipe(Image.new("RGB", (64, 64))),
+        )
+        config = ModuleConfig.load(model_config_path)
+        self.batch_size = config.get("batch_size", DEFAULT_BATCH_SIZE)
+
+    def run(
+        self,
+        encoded_bytes_or_urls: List[str] = None,
+        images_bytes: List[bytes] = None,
+    ) -> ObjectDetectionBatchResult:  # pylint: disable=arguments-differ
+        """Run HF object detection on a batch of images
+        Args:
+            encoded_bytes_or_urls Encoded image bytes (or url strings)
+            images_bytes Raw image file bytes (used instead of encoded_bytes_or_urls)
+        Returns:
+            ObjectDetectionBatchResult: one result per image, in input order.
+        """
+        images = HFBase.get_images(encoded_bytes_or_urls, images_bytes)
+        results = self.pipe(images, batch_size=self.batch_size, threshold=0.5)
+        stage_metrics.observe_output(sum(len(r) for r in results), "objects")
+        return ObjectDetectionBatchResult([to_result(r) for r in results])
 
     @classmethod
     def load(cls, model_config_path):
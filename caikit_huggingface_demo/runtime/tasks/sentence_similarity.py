@@ -13,20 +13,30 @@
 # limitations under the License
 
 # Standard
-from pathlib import Path
 from typing import List
+import json
+import os
 
 # Third Party
+from huggingface_hub import snapshot_download
 from module_ids import SENTENCE_SIMILARITY
+from runtime import precision as precisions
+from runtime import stage_metrics
 from runtime.data_model.embeddings import EmbeddingsPair, Result
+from runtime.embedding_cache import EmbeddingCache
 from runtime.hf_base import HFBase
-from sentence_transformers import SentenceTransformer
+from runtime.weight_registry import WEIGHTS, read_only
+from sentence_transformers import SentenceTransformer, models
+from sentence_transformers.util import import_from_string
+from transformers import AutoModel, T5Config, T5EncoderModel
+import numpy
+import torch
 
 # Local
-from caikit.core import ModuleBase, TaskBase, module, task
+from caikit.core import ModuleBase, ModuleConfig, TaskBase, module, task
 
 DEFAULT_HF_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
-HOME = Path.home()
+DEFAULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
 
 
 @task(
@@ -37,28 +47,157 @@ class SentenceSimilarityTask(TaskBase):
     pass
 
 
+class SharedTransformer(models.Transformer):
+    """The sentence-transformers Transformer module, but with the registry's copy of
+    the transformer weights (see WeightRegistry) instead of loading its own"""
+
+    def __init__(self, hf_model, hf_revision, precision, backend, **config) -> None:
+        # Read by _load_model(), which the base class calls from its __init__
+        self.load_options = (hf_revision, precision, backend)
+        super().__init__(
+            hf_model,
+            model_args={"revision": hf_revision},
+            tokenizer_args={"revision": hf_revision},
+            **config,
+        )
+
+    def _load_model(self, model_name_or_path, config, *args, **kwargs):
+        hf_revision, precision, backend = self.load_options
+        auto_class = T5EncoderModel if isinstance(config, T5Config) else AutoModel
+        if backend == "onnxruntime":
+            self.auto_model = HFBase.shared_onnx_model(
+                auto_class, model_name_or_path, hf_revision
+            )
+        else:
+            self.auto_model = WEIGHTS.pretrained(
+                auto_class,
+                model_name_or_path,
+                revision=hf_revision,
+                precision=precision,
+            )
+
+
 @module(SENTENCE_SIMILARITY, "sentence-similarity", "0.0.0", SentenceSimilarityTask)
 class SentenceSimilarity(HFBase, ModuleBase):
     """Class to wrap sentence-similarity models with sentence transformers"""
 
     def __init__(self, model_config_path) -> None:
         super().__init__()
-        hf_model, _hf_revision = self.read_config(
+        hf_model, hf_revision = self.read_config(
             model_config_path, DEFAULT_HF_MODEL, None
         )
-        self.model = SentenceTransformer(
-            hf_model, cache_folder=f"{HOME}/.cache/huggingface/sentence_transformers"
+        precision = self.read_precision(model_config_path)
+        backend = self.read_backend(model_config_path)
+        self.model = WEIGHTS.get(
+            ("SentenceTransformer", hf_model, hf_revision, precision, backend),
+            lambda: self.load_sentence_transformer(
+                hf_model, hf_revision, precision, backend
+            ),
         )
+        config = ModuleConfig.load(model_config_path)
+        self.output_format = config.get("output_format", "")
+
+        # Embedding cache (cache_max_bytes: 0 disables, cache_dir adds the disk tier)
+        self.cache = None
+        cache_max_bytes = config.get("cache_max_bytes", DEFAULT_CACHE_MAX_BYTES)
+        if cache_max_bytes:
+            cache_dir = config.get("cache_dir")
+            self.cache = EmbeddingCache(
+                model_id=hf_model,
+                max_bytes=cache_max_bytes,
+                disk_dir=os.path.join(cache_dir, hf_model.replace("/", "--"))
+                if cache_dir
+                else None,
+                disk_max_rows=config.get("cache_disk_max_rows", 1000000),
+                dim=self.model.get_sentence_embedding_dimension(),
+            )
 
     def run(
-        self, sentences: List[str], **kwargs
+        self, sentences: List[str], output_format: str = "", **kwargs
     ) -> Result:  # pylint: disable=arguments-differ
-        embeddings = self.model.encode(sentences)
+        output_format = output_format or self.output_format
+        stage_metrics.observe_input(len(sentences), "sentences")
+        if self.cache:
+            embeddings = self.cache.get_or_encode(sentences, self.encode)
+        else:
+            embeddings = self.encode(sentences)
+        stage_metrics.observe_output(len(embeddings), "vectors")
+
+        with stage_metrics.stage("format"):
+            if output_format:
+                return Result(
+                    packed=HFBase.pack_array(embeddings, output_format),
+                    inputs=list(range(len(sentences))),
+                )
+
+            results: List[EmbeddingsPair] = []
+            for i, e in enumerate(embeddings):
+                results.append(EmbeddingsPair(input=i, output=e))
+            return Result(results)
+
+    def encode(self, sentences: List[str]) -> numpy.ndarray:
+        """Encode sentences as float32 (also for bf16 models, which numpy lacks)"""
+        with stage_metrics.stage("forward"):
+            embeddings = self.model.encode(sentences, convert_to_tensor=True)
+            return embeddings.float().cpu().numpy()
+
+    @staticmethod
+    def load_sentence_transformer(
+        hf_model, hf_revision, precision="fp32", backend="torch"
+    ) -> SentenceTransformer:
+        """Load a read-only SentenceTransformer in precision whose transformer weights
+        are shared with other modules using the same AutoModel (e.g. Embeddings).
+        With backend onnxruntime the transformer runs the model's ONNX export.
+
+        The modules are built from the model's modules.json like SentenceTransformer
+        does, except that Transformer modules are SharedTransformers, so the weights
+        are loaded once (not loaded and then replaced by the shared copy)."""
+        path = (
+            hf_model
+            if os.path.isdir(hf_model)
+            else snapshot_download(
+                hf_model,
+                revision=hf_revision,
+                ignore_patterns=["*.h5", "*.msgpack", "*.ot", "*.onnx", "openvino/*"],
+            )
+        )
+        modules_path = os.path.join(path, "modules.json")
+        if not os.path.exists(modules_path):
+            # A plain transformers model. Mean pooling, like SentenceTransformer.
+            transformer = SharedTransformer(hf_model, hf_revision, precision, backend)
+            pooling = models.Pooling(transformer.get_word_embedding_dimension(), "mean")
+            return read_only(SentenceTransformer(modules=[transformer, pooling]))
 
-        results: List[EmbeddingsPair] = []
-        for i, e in enumerate(embeddings):
-            results.append(EmbeddingsPair(input=i, output=e))
-        return Result(results)
+        with open(modules_path, encoding="utf-8") as f:
+            modules_config = json.load(f)
+        modules = []
+        shared = False
+        for module_config in modules_config:
+            module_class = import_from_string(module_config["type"])
+            module_path = os.path.join(path, module_config["path"])
+            config_path = os.path.join(module_path, "sentence_bert_config.json")
+            # Only a Transformer at the top level uses the weights of hf_model itself
+            if (
+                issubclass(module_class, models.Transformer)
+                and not module_config["path"]
+                and os.path.exists(config_path)
+            ):
+                with open(config_path, encoding="utf-8") as f:
+                    config = json.load(f)
+                modules.append(
+                    SharedTransformer(
+                        hf_model, hf_revision, precision, backend, **config
+                    )
+                )
+                shared = True
+            else:
+                modules.append(module_class.load(module_path))
+        model = SentenceTransformer(modules=modules)
+        if not shared and precision == "bf16":
+            model = model.to(torch.bfloat16)
+        elif not shared and precision == "int8-dynamic":
+            model = precisions.quantize(model)
+        return read_only(model)
 
     @classmethod
     def load(cls, model_path):
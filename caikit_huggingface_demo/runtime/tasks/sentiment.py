@@ -13,12 +13,14 @@
 # limitations under the License
 
 # Standard
+from typing import List
 import os
 
 # Third Party
 from module_ids import SENTIMENT
+from runtime import stage_metrics
 from runtime.data_model.classification import ClassificationPrediction, ClassInfo
-from transformers import pipeline
+from runtime.hf_base import HFBase
 
 # Local
 from caikit.core import ModuleBase, ModuleLoader, ModuleSaver, TaskBase, module, task
@@ -33,20 +35,23 @@ class SentimentTask(TaskBase):
 
 
 @module(SENTIMENT, "sentiment-analysis", "0.0.0", SentimentTask)
-class Sentiment(ModuleBase):
+class Sentiment(HFBase, ModuleBase):
     """Class to wrap sentiment analysis pipeline from Hugging Face"""
 
     def __init__(self, model_path) -> None:
         super().__init__()
         loader = ModuleLoader(model_path)
         config = loader.config
-        model = pipeline(
+        model = self.shared_pipeline(
             model=config.hf_model,
             revision=config.hf_revision,
             task="sentiment-analysis",
+            precision=self.read_precision(model_path),
+            backend=self.read_backend(model_path),
             return_all_scores=True,
         )
         self.sentiment_pipeline = model
+        self.configure_batching(model_path)
 
     def run(
         self, text_in: str, **kwargs
@@ -57,16 +62,33 @@ class Sentiment(ModuleBase):
         Returns:
             ClassificationPrediction: predicted classes with their confidence score.
         """
-        raw_results = self.sentiment_pipeline([text_in])  # , top_k=9)
-        class_info = []
-        for result in raw_results:
-            for sentiments in result:
-                class_info.append(
+        prediction = self.run_batched(text_in=text_in)
+        stage_metrics.observe_output(len(prediction.classes), "classes")
+        return prediction
+
+    def run_batch(
+        self, text_in: List[str], **kwargs
+    ) -> List[ClassificationPrediction]:  # pylint: disable=arguments-differ
+        """Run HF sentiment analysis on a batch of texts with one padded forward pass
+        Args:
+            text_in List[str]
+        Returns:
+            List[ClassificationPrediction]: one prediction per input text, in order.
+        """
+        raw_results = self.sentiment_pipeline(
+            list(text_in), batch_size=len(text_in)
+        )  # , top_k=9)
+        return [
+            ClassificationPrediction(
+                [
                     ClassInfo(
                         class_name=sentiments["label"], confidence=sentiments["score"]
                     )
-                )
-        return ClassificationPrediction(class_info)
+                    for sentiments in result
+                ]
+            )
+            for result in raw_results
+        ]
 
     @classmethod
     def bootstrap(cls, model_path="distilbert-base-uncased-finetuned-sst-2-english"):
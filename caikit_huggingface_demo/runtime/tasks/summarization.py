@@ -12,18 +12,35 @@
 # See the License for the specific language governing permissions and
 # limitations under the License
 
+# Standard
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
 # Third Party
 from module_ids import SUMMARIZATION
+from runtime import stage_metrics
 from runtime.data_model.results import Text
 from runtime.hf_base import HFBase
+from runtime.weight_registry import WEIGHTS
 from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
 
+# First Party
+import alog
+
 # Local
-from caikit.core import ModuleBase, TaskBase, module, task
+from caikit.core import ModuleBase, ModuleConfig, TaskBase, module, task
+
+log = alog.use_channel("SUMMARIZE")
 
 DEFAULT_MODEL = "JulesBelveze/t5-small-headline-generator"
 DEFAULT_MODEL_REVISION = "0db30a2"
 
+# Long-document (map-reduce) defaults. chunk_size defaults to the model max input length.
+FALLBACK_CHUNK_SIZE = 512
+DEFAULT_CHUNK_OVERLAP = 64
+DEFAULT_CHUNK_BATCH_SIZE = 8
+DEFAULT_CHUNK_WORKERS = 1
+
 
 @task(
     required_parameters={"text_in": str},
@@ -35,21 +52,138 @@ class SummarizationTask(TaskBase):
 
 @module(id=SUMMARIZATION, name="summarization", version="0.0.0", task=SummarizationTask)
 class Summarization(HFBase, ModuleBase):
+    def __init__(
+        self,
+        model=None,
+        tokenizer=None,
+        chunk_size=None,
+        chunk_overlap=DEFAULT_CHUNK_OVERLAP,
+        chunk_batch_size=DEFAULT_CHUNK_BATCH_SIZE,
+        chunk_workers=DEFAULT_CHUNK_WORKERS,
+    ) -> None:
+        super().__init__(model, tokenizer)
+        if not chunk_size:
+            max_length = getattr(tokenizer, "model_max_length", None)
+            chunk_size = (
+                max_length - 1  # Leave room for the end-of-sequence token
+                if max_length and max_length < 100000  # Unset is a huge sentinel
+                else FALLBACK_CHUNK_SIZE
+            )
+        if not 0 <= chunk_overlap < chunk_size:
+            raise ValueError(
+                f"chunk_overlap ({chunk_overlap}) must be >= 0 and < chunk_size ({chunk_size})"
+            )
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.chunk_batch_size = max(1, chunk_batch_size)
+        self.chunk_workers = max(1, chunk_workers)
+        # Shared by all requests, so chunk_workers bounds the concurrent batches
+        self.executor = (
+            ThreadPoolExecutor(
+                max_workers=self.chunk_workers, thread_name_prefix="summarize"
+            )
+            if self.chunk_workers > 1
+            else None
+        )
+
     def run(self, text_in: str) -> Text:  # pylint: disable=arguments-differ
-        input_ids = self.tokenizer(text_in, return_tensors="pt")["input_ids"]
-        output_ids = self.model.generate(input_ids)[0]
-        summary = self.tokenizer.decode(output_ids, skip_special_tokens=True)
+        with stage_metrics.stage("preprocess"):
+            token_ids = self.tokenizer(text_in, add_special_tokens=False)["input_ids"]
+        stage_metrics.observe_input(len(token_ids), "tokens")
+        if len(token_ids) > self.chunk_size:
+            with stage_metrics.stage("forward"):
+                return Text(self._summarize_long(token_ids))
+
+        with stage_metrics.stage("preprocess"):
+            input_ids = self.tokenizer(text_in, return_tensors="pt")["input_ids"]
+        with stage_metrics.stage("forward"):
+            output_ids = self.model.generate(input_ids)[0]
+        stage_metrics.observe_output(len(output_ids), "tokens")
+        with stage_metrics.stage("postprocess"):
+            summary = self.tokenizer.decode(output_ids, skip_special_tokens=True)
         return Text(summary)
 
+    def _summarize_long(self, token_ids: List[int]) -> str:
+        """Map-reduce: summarize overlapping chunks, then summarize the joined summaries
+        (repeating while they still do not fit in one chunk)."""
+        while len(token_ids) > self.chunk_size:
+            partial_summaries = self._summarize_batched(self._split(token_ids))
+            reduced_ids = self.tokenizer(
+                " ".join(partial_summaries), add_special_tokens=False
+            )["input_ids"]
+            if len(reduced_ids) >= len(token_ids):
+                # Not converging. The final pass truncates instead.
+                log.warning(
+                    "<SUM30571148W>",
+                    "Partial summaries stopped shrinking at %d tokens. Dropping the "
+                    "last %d tokens to fit one chunk of %d.",
+                    len(token_ids),
+                    len(token_ids) - self.chunk_size,
+                    self.chunk_size,
+                )
+                break
+            token_ids = reduced_ids
+
+        final_text = self.tokenizer.decode(token_ids[: self.chunk_size])
+        return self._summarize_batched([final_text])[0]
+
+    def _split(self, token_ids: List[int]) -> List[str]:
+        """Split token ids into chunk_size windows overlapping by chunk_overlap tokens"""
+        step = self.chunk_size - self.chunk_overlap
+        starts = range(0, max(len(token_ids) - self.chunk_overlap, 1), step)
+        return [
+            self.tokenizer.decode(token_ids[start : start + self.chunk_size])
+            for start in starts
+        ]
+
+    def _summarize_batched(self, texts: List[str]) -> List[str]:
+        """Summarize texts in padded batches, optionally running batches on a worker pool"""
+        batches = [
+            texts[i : i + self.chunk_batch_size]
+            for i in range(0, len(texts), self.chunk_batch_size)
+        ]
+        if self.executor and len(batches) > 1:
+            results = list(self.executor.map(self._summarize_batch, batches))
+        else:
+            results = [self._summarize_batch(batch) for batch in batches]
+        return [summary for batch in results for summary in batch]
+
+    def _summarize_batch(self, texts: List[str]) -> List[str]:
+        inputs = self.tokenizer(
+            texts,
+            return_tensors="pt",
+            padding=True,
+            truncation=True,
+            max_length=self.chunk_size + 1,
+        )
+        output_ids = self.model.generate(**inputs)
+        return self.tokenizer.batch_decode(output_ids, skip_special_tokens=True)
+
     @classmethod
     def load(cls, model_config_path: str):
         model_name, model_revision = HFBase.read_config(
             model_config_path, DEFAULT_MODEL, DEFAULT_MODEL_REVISION
         )
+        config = ModuleConfig.load(model_config_path)
 
         # Instantiate from pretrained
-        model = AutoModelForSeq2SeqLM.from_pretrained(
-            model_name, revision=model_revision
+        compile_options = HFBase.read_compile_options(model_config_path)
+        model = WEIGHTS.pretrained(
+            AutoModelForSeq2SeqLM,
+            model_name,
+            revision=model_revision,
+            precision=HFBase.read_precision(model_config_path),
+            compile_options=compile_options,
+        )
+        tokenizer = WEIGHTS.pretrained(
+            AutoTokenizer, model_name, revision=model_revision
+        )
+        HFBase.warmup_generate(model, tokenizer, compile_options)
+        return cls(
+            model,
+            tokenizer,
+            chunk_size=config.get("chunk_size"),
+            chunk_overlap=config.get("chunk_overlap", DEFAULT_CHUNK_OVERLAP),
+            chunk_batch_size=config.get("chunk_batch_size", DEFAULT_CHUNK_BATCH_SIZE),
+            chunk_workers=config.get("chunk_workers", DEFAULT_CHUNK_WORKERS),
         )
-        tokenizer = AutoTokenizer.from_pretrained(model_name, revision=model_revision)
-        return cls(model, tokenizer)
@@ -12,11 +12,18 @@
 # See the License for the specific language governing permissions and
 # limitations under the License
 
+# Standard
+from contextvars import copy_context
+from threading import Thread
+from typing import Iterable
+
 # Third Party
 from module_ids import TEXT_GENERATION
+from runtime import stage_metrics
 from runtime.data_model.results import Text
 from runtime.hf_base import HFBase
-from transformers import AutoModelForCausalLM, AutoTokenizer
+from runtime.weight_registry import WEIGHTS
+from transformers import AutoModelForCausalLM, AutoTokenizer, TextIteratorStreamer
 
 # Local
 from caikit.core import ModuleBase, TaskBase, module, task
@@ -28,6 +35,7 @@ DEFAULT_MODEL_REVISION = "4a18ca7"  # To prevent extra downloads and surprises
 @task(
     required_parameters={"text_in": str},
     output_type=Text,
+    streaming_output_type=Iterable[Text],
 )
 class TextGenerationTask(TaskBase):
     pass
@@ -37,12 +45,49 @@ class TextGenerationTask(TaskBase):
     id=TEXT_GENERATION, name="text_generation", version="0.0.0", task=TextGenerationTask
 )
 class TextGeneration(HFBase, ModuleBase):
+    @TextGenerationTask.taskmethod()
     def run(self, text_in: str) -> Text:  # pylint: disable=arguments-differ
-        input_ids = self.tokenizer(text_in, return_tensors="pt")["input_ids"]
-        output_ids = self.model.generate(input_ids)[0]
-        result = self.tokenizer.decode(output_ids, skip_special_tokens=True)
+        with stage_metrics.stage("preprocess"):
+            input_ids = self.tokenizer(text_in, return_tensors="pt")["input_ids"]
+        stage_metrics.observe_input(input_ids.shape[-1], "tokens")
+        with stage_metrics.stage("forward"):
+            output_ids = self.model.generate(input_ids)[0]
+        # The output starts with the prompt
+        stage_metrics.observe_output(len(output_ids) - input_ids.shape[-1], "tokens")
+        with stage_metrics.stage("postprocess"):
+            result = self.tokenizer.decode(output_ids, skip_special_tokens=True)
         return Text(result)
 
+    @TextGenerationTask.taskmethod(output_streaming=True)
+    def run_stream_out(self, text_in: str) -> Iterable[Text]:
+        """Stream decoded text chunks as generate() produces tokens.
+        The concatenated chunks are the same text that run() returns."""
+        with stage_metrics.stage("preprocess"):
+            input_ids = self.tokenizer(text_in, return_tensors="pt")["input_ids"]
+        stage_metrics.observe_input(input_ids.shape[-1], "tokens")
+        streamer = TextIteratorStreamer(self.tokenizer, skip_special_tokens=True)
+        errors = []
+
+        def generate():
+            try:
+                with stage_metrics.stage("forward"):
+                    self.model.generate(input_ids, streamer=streamer)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                # Re-raised on the consumer side so the RPC fails instead of hanging
+                errors.append(e)
+                streamer.end()
+
+        # Run in a copy of this context so the forward stage counts for this request
+        thread = Thread(target=copy_context().run, args=(generate,), daemon=True)
+        thread.start()
+        for chunk in streamer:
+            if chunk:
+                stage_metrics.observe_output(1, "chunks")
+                yield Text(chunk)
+        thread.join()
+        if errors:
+            raise errors[0]
+
     @classmethod
     def load(cls, model_config_path: str):
         model_name, model_revision = HFBase.read_config(
@@ -50,8 +95,16 @@ class TextGeneration(HFBase, ModuleBase):
         )
 
         # Instantiate from pretrained
-        model = AutoModelForCausalLM.from_pretrained(
-            model_name, revision=model_revision
+        compile_options = HFBase.read_compile_options(model_config_path)
+        model = WEIGHTS.pretrained(
+            AutoModelForCausalLM,
+            model_name,
+            revision=model_revision,
+            precision=HFBase.read_precision(model_config_path),
+            compile_options=compile_options,
+        )
+        tokenizer = WEIGHTS.pretrained(
+            AutoTokenizer, model_name, revision=model_revision
         )
-        tokenizer = AutoTokenizer.from_pretrained(model_name, revision=model_revision)
+        HFBase.warmup_generate(model, tokenizer, compile_options)
         return cls(model, tokenizer)
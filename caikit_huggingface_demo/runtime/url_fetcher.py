@@ -0,0 +1,115 @@
+# Copyright The Caikit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+# Standard
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+import threading
+import time
+
+# Third Party
+from requests.adapters import HTTPAdapter
+import requests
+
+
+class UrlFetcher:
+    """Fetch URL content over a pooled session, with a size-bounded TTL cache that
+    revalidates stale entries by ETag, and an I/O thread pool for fetching many URLs."""
+
+    def __init__(
+        self,
+        timeout_s: float = 10,
+        max_bytes: int = 20 * 1024 * 1024,
+        cache_max_bytes: int = 64 * 1024 * 1024,
+        cache_ttl_s: float = 300,
+        pool_size: int = 16,
+    ) -> None:
+        self.timeout_s = timeout_s
+        self.max_bytes = max_bytes
+        self.cache_max_bytes = cache_max_bytes
+        self.cache_ttl_s = cache_ttl_s
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.executor = ThreadPoolExecutor(
+            max_workers=pool_size, thread_name_prefix="url-fetch"
+        )
+
+        # url -> (content, etag, fetched_at), least recently used first
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._cache_bytes = 0
+        self._lock = threading.Lock()
+
+    def fetch(self, url: str) -> bytes:
+        """Return the content at url (from the cache when fresh)"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(url)
+            if cached:
+                self._cache.move_to_end(url)
+                if now - cached[2] <= self.cache_ttl_s:
+                    return cached[0]
+
+        headers = {"If-None-Match": cached[1]} if cached and cached[1] else {}
+        with self.session.get(
+            url, headers=headers, stream=True, timeout=self.timeout_s
+        ) as response:
+            if response.status_code == 304 and cached:
+                content = cached[0]  # Unchanged, so only refresh the timestamp
+                # A 304 may omit the ETag. Keep revalidating with the cached one.
+                etag = response.headers.get("ETag") or cached[1]
+            else:
+                response.raise_for_status()
+                content = self._read_limited(response)
+                etag = response.headers.get("ETag")
+
+        self._store(url, content, etag, time.monotonic())
+        return content
+
+    def fetch_many(self, urls: List[str]) -> List[bytes]:
+        """Fetch urls concurrently on the I/O pool. Results are in the same order."""
+        return list(self.executor.map(self.fetch, urls))
+
+    def _read_limited(self, response: requests.Response) -> bytes:
+        length = response.headers.get("Content-Length")
+        if length and length.isdigit() and int(length) > self.max_bytes:
+            raise ValueError(f"Content at URL is larger than {self.max_bytes} bytes")
+        chunks = []
+        size = 0
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            size += len(chunk)
+            if size > self.max_bytes:
+                raise ValueError(
+                    f"Content at URL is larger than {self.max_bytes} bytes"
+                )
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    def _store(
+        self, url: str, content: bytes, etag: Optional[str], fetched_at: float
+    ) -> None:
+        if len(content) > self.cache_max_bytes:
+            return
+        with self._lock:
+            old = self._cache.pop(url, None)
+            if old:
+                self._cache_bytes -= len(old[0])
+            self._cache[url] = (content, etag, fetched_at)
+            self._cache_bytes += len(content)
+            while self._cache_bytes > self.cache_max_bytes:
+                _, (evicted, _, _) = self._cache.popitem(last=False)
+                self._cache_bytes -= len(evicted)
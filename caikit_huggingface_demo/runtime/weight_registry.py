@@ -0,0 +1,109 @@
+# Copyright The Caikit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+# Standard
+from typing import Callable, Dict, Hashable, List
+import threading
+import weakref
+
+# Third Party
+from runtime import compilation
+from runtime import precision as precisions
+
+# First Party
+import alog
+
+log = alog.use_channel("WEIGHTS")
+
+
+def read_only(model):
+    """Put a shared torch model in eval mode with gradients disabled"""
+    model.eval()
+    model.requires_grad_(False)
+    return model
+
+
+class WeightRegistry:
+    """Process-wide registry of loaded weights (models, tokenizers, pipelines).
+
+    Entries are keyed by e.g. (class, model name, revision, dtype) and held weakly.
+    Every module that gets an entry holds a reference to the same instance, so the
+    weights stay loaded while any module uses them and are freed by reference
+    counting when the last one is unloaded. Loads of the same key are deduplicated.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._loading: Dict[Hashable, threading.Lock] = {}
+        self._shared = weakref.WeakValueDictionary()
+
+    def get(self, key: Hashable, factory: Callable[[], object]):
+        """Return the shared instance for key, calling factory() if it is not loaded"""
+        value = self._shared.get(key)
+        if value is not None:
+            log.debug("<WGT19220437D>", "Sharing loaded weights for %s", key)
+            return value
+
+        with self._lock:
+            key_lock = self._loading.setdefault(key, threading.Lock())
+        with key_lock:  # Concurrent loads of one key wait for the first
+            value = self._shared.get(key)
+            if value is None:
+                log.info("<WGT19220438I>", "Loading weights for %s", key)
+                value = factory()
+                self._shared[key] = value
+        with self._lock:
+            self._loading.pop(key, None)
+        return value
+
+    def pretrained(
+        self,
+        auto_class,
+        name: str,
+        revision: str = None,
+        precision: str = "fp32",
+        compile_options: compilation.CompileOptions = compilation.CompileOptions(),
+        **kwargs,
+    ):
+        """Shared auto_class.from_pretrained(name, revision=revision, **kwargs) in
+        precision (see runtime.precision) with compile_options applied (see
+        runtime.compilation). Models are made read-only (eval mode, no gradients)."""
+        key = (
+            auto_class.__name__,
+            name,
+            revision,
+            precision,
+            compile_options,
+            tuple(sorted(kwargs.items())),
+        )
+
+        def load():
+            loaded = precisions.from_pretrained(
+                auto_class, name, revision, precision, **kwargs
+            )
+            if not hasattr(loaded, "eval"):
+                return loaded  # e.g. tokenizers
+            return compilation.apply(read_only(loaded), compile_options)
+
+        return self.get(key, load)
+
+    def keys(self) -> List[Hashable]:
+        """Keys of the weights currently loaded (and in use)"""
+        return list(self._shared.keys())
+
+    def __len__(self) -> int:
+        return len(self._shared)
+
+
+WEIGHTS = WeightRegistry()
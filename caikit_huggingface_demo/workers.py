@@ -0,0 +1,158 @@
+# Copyright The Caikit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+# Standard
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+import gc
+import os
+import signal
+import time
+import traceback
+
+# Third Party
+from admin import serve_admin
+from prometheus_client import start_http_server
+
+# First Party
+import alog
+
+# Local
+from caikit.config import get_config
+from caikit.runtime.grpc_server import RuntimeGRPCServer
+from caikit.runtime.service_factory import ServicePackage
+
+log = alog.use_channel("WORKERS")
+
+
+@dataclass
+class WorkerProcess:
+    """A process for WorkerSupervisor to fork: target runs in the child, which exits
+    when it returns. With restart, the child is forked again if it exits unexpectedly.
+    """
+
+    name: str
+    target: Callable[[], None]
+    restart: bool = True
+
+
+class WorkerSupervisor:
+    """Forks and supervises backend processes (e.g. N Caikit gRPC servers sharing
+    one port, or a router with per-model processes).
+
+    Models loaded by the parent before forking are shared by the workers
+    copy-on-write. The parent restarts workers that exit and stops them all on
+    SIGINT/SIGTERM.
+
+    Create this before anything in the parent creates gRPC servers or channels
+    (gRPC does not survive fork).
+    """
+
+    def __init__(
+        self, processes: List[WorkerProcess], restart_delay_s: float = 1.0
+    ) -> None:
+        self.processes = processes
+        self.restart_delay_s = restart_delay_s
+        self.pids: Dict[int, WorkerProcess] = {}
+        self.stopping = False
+
+    def run(self) -> int:
+        """Start the processes and supervise them until stopped"""
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGTERM, self._stop)
+
+        # Keep the loaded models out of the cyclic GC so that collections in the
+        # workers do not write to (and copy) the shared pages
+        gc.freeze()
+
+        for process in self.processes:
+            self._spawn(process)
+
+        while self.pids:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            process = self.pids.pop(pid, None)
+            if process is None or self.stopping:
+                continue
+            print(f"⚠️  {process.name} (pid {pid}) exited with status {status}")
+            if process.restart:
+                time.sleep(self.restart_delay_s)
+                if not self.stopping:
+                    print(f"🔁 Restarting {process.name}")
+                    self._spawn(process)
+        print("⏹️  Stopped")
+        return 0
+
+    def _spawn(self, process: WorkerProcess) -> None:
+        pid = os.fork()
+        if pid:
+            self.pids[pid] = process
+            return
+
+        # Child process
+        exit_code = 0
+        try:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            process.target()
+        except KeyboardInterrupt:
+            pass
+        except BaseException:  # pylint: disable=broad-exception-caught
+            traceback.print_exc()
+            exit_code = 1
+        finally:
+            os._exit(exit_code)  # pylint: disable=protected-access
+
+    def _stop(self, signum, _frame) -> None:
+        if self.stopping:
+            return
+        self.stopping = True
+        print(f"\n⏹️  Stopping {len(self.pids)} processes due to signal {signum}")
+        for pid in list(self.pids):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+
+def serve_worker_metrics(index: int) -> Optional[int]:
+    """Serve a worker's metrics on metrics.port + 1 + index (the parent keeps
+    metrics.port) and return the port, or None if it is not available"""
+    metrics_port = get_config().runtime.metrics.port + 1 + index
+    try:
+        start_http_server(metrics_port)
+    except OSError as e:
+        # Serve without metrics rather than fail (and be restarted) over it
+        log.warning("<WRK61120531W>", "No metrics on port %d: %s", metrics_port, e)
+        return None
+    return metrics_port
+
+
+def serve_backend(inference_service: ServicePackage, index: int) -> None:
+    """Run a Caikit gRPC server on the configured port (shared with the other
+    backend workers with SO_REUSEPORT) until SIGINT/SIGTERM"""
+    metrics_port = serve_worker_metrics(index)
+    admin_port = serve_admin(index)
+    print(
+        f"▶️  Backend worker {index} (pid {os.getpid()}) serving, "
+        f"metrics port {metrics_port}, admin port {admin_port}"
+    )
+    server = RuntimeGRPCServer(
+        inference_service=inference_service,
+        training_service=None,
+        handle_terminations=True,  # SIGINT/SIGTERM stop with the grace period
+    )
+    server.start(blocking=True)
@@ -0,0 +1,108 @@
+# Copyright The Caikit Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+
+# Standard
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+import threading
+
+# Third Party
+from runtime.url_fetcher import UrlFetcher
+import pytest
+
+
+class _Resource:
+    """What the stand-in server serves, and the If-None-Match headers it got"""
+
+    def __init__(self) -> None:
+        self.content = b"image-v1"
+        self.etag = '"v1"'
+        self.etag_on_304 = True
+        self.if_none_match: List[Optional[str]] = []
+
+
+@pytest.fixture(name="server")
+def fixture_server():
+    resource = _Resource()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):  # pylint: disable=invalid-name
+            if_none_match = self.headers.get("If-None-Match")
+            resource.if_none_match.append(if_none_match)
+            if if_none_match == resource.etag:
+                self.send_response(304)
+                if resource.etag_on_304:
+                    self.send_header("ETag", resource.etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("ETag", resource.etag)
+            self.send_header("Content-Length", str(len(resource.content)))
+            self.end_headers()
+            self.wfile.write(resource.content)
+
+        def log_message(self, *args):  # pylint: disable=arguments-differ
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/image.png", resource
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_fresh_cache_hit_does_not_refetch(server):
+    url, resource = server
+    fetcher = UrlFetcher(cache_ttl_s=300)
+    assert fetcher.fetch(url) == b"image-v1"
+    assert fetcher.fetch(url) == b"image-v1"
+    assert resource.if_none_match == [None]
+
+
+def test_stale_entry_is_revalidated_with_etag(server):
+    url, resource = server
+    fetcher = UrlFetcher(cache_ttl_s=0)
+    assert fetcher.fetch(url) == b"image-v1"
+    assert fetcher.fetch(url) == b"image-v1"  # 304
+    assert resource.if_none_match == [None, '"v1"']
+
+
+def test_304_without_etag_keeps_the_cached_etag(server):
+    url, resource = server
+    resource.etag_on_304 = False
+    fetcher = UrlFetcher(cache_ttl_s=0)
+    fetcher.fetch(url)
+    fetcher.fetch(url)  # 304 without an ETag header
+    assert fetcher.fetch(url) == b"image-v1"
+    assert resource.if_none_match == [None, '"v1"', '"v1"']
+
+
+def test_changed_content_replaces_stale_entry(server):
+    url, resource = server
+    fetcher = UrlFetcher(cache_ttl_s=0)
+    assert fetcher.fetch(url) == b"image-v1"
+    resource.content = b"image-v2"
+    resource.etag = '"v2"'
+    assert fetcher.fetch(url) == b"image-v2"  # The old ETag no longer matches
+    assert fetcher.fetch(url) == b"image-v2"
+    assert resource.if_none_match == [None, '"v1"', '"v2"']
+
+
+def test_content_over_max_bytes_is_rejected(server):
+    url, _ = server
+    fetcher = UrlFetcher(max_bytes=4)
+    with pytest.raises(ValueError):
+        fetcher.fetch(url)